@@ -0,0 +1,292 @@
+import logging
+import multiprocessing as mp
+import os
+import queue
+import time
+import numpy as np
+from Instrumentation import Profiler
+
+logger = logging.getLogger(__name__)
+
+# Indices into the shared metrics array
+TRANSITIONS, UPDATES, STALENESS_SUM, STALENESS_COUNT = range(4)
+
+
+class SharedTransitionQueue:
+    """
+    Bounded multi-producer transition queue stored in shared-memory arrays.
+
+    Actors put one transition at a time and block while the queue is full; the learner drains
+    everything available in one call. Transitions are copied straight into and out of the
+    preallocated arrays, so nothing is pickled on the way.
+    """
+
+    def __init__(self, capacity, state_size, ctx=None):
+        ctx = ctx or mp.get_context("spawn")
+        self.capacity = capacity
+        self.state_size = state_size
+        self._states = ctx.RawArray("f", capacity * state_size)
+        self._actions = ctx.RawArray("i", capacity)
+        self._rewards = ctx.RawArray("f", capacity)
+        self._next_states = ctx.RawArray("f", capacity * state_size)
+        self._dones = ctx.RawArray("b", capacity)
+        self._head = ctx.RawValue("l", 0)  # Next slot to read
+        self._count = ctx.RawValue("l", 0)  # Number of queued transitions
+        self._cond = ctx.Condition()
+
+    def _views(self):
+        return (np.frombuffer(self._states, dtype=np.float32).reshape(self.capacity, self.state_size),
+                np.frombuffer(self._actions, dtype=np.int32),
+                np.frombuffer(self._rewards, dtype=np.float32),
+                np.frombuffer(self._next_states, dtype=np.float32).reshape(self.capacity, self.state_size),
+                np.frombuffer(self._dones, dtype=np.int8))
+
+    def __len__(self):
+        return self._count.value
+
+    def put(self, state, action, reward, next_state, done, timeout=None):
+        """Append one transition, waiting while the queue is full. Raises queue.Full on timeout."""
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._count.value < self.capacity, timeout):
+                raise queue.Full
+            i = (self._head.value + self._count.value) % self.capacity
+            states, actions, rewards, next_states, dones = self._views()
+            states[i] = np.reshape(state, self.state_size)
+            actions[i] = action
+            rewards[i] = reward
+            next_states[i] = np.reshape(next_state, self.state_size)
+            dones[i] = done
+            self._count.value += 1
+            self._cond.notify_all()
+
+    def get_batch(self, max_items, timeout=None):
+        """
+        Remove up to max_items transitions, waiting up to timeout for at least one.
+        :return: (states, actions, rewards, next_states, dones) arrays, possibly empty.
+        """
+        with self._cond:
+            self._cond.wait_for(lambda: self._count.value > 0, timeout)
+            n = min(self._count.value, max_items)
+            indices = (self._head.value + np.arange(n)) % self.capacity
+            batch = tuple(column[indices] for column in self._views())
+            self._head.value = (self._head.value + n) % self.capacity
+            self._count.value -= n
+            self._cond.notify_all()
+        states, actions, rewards, next_states, dones = batch
+        return states, actions, rewards, next_states, dones.astype(bool)
+
+
+class SharedWeights:
+    """Flat shared-memory copy of the Q-network weights with a version counter and the current epsilon."""
+
+    def __init__(self, weights, ctx=None):
+        ctx = ctx or mp.get_context("spawn")
+        self.shapes = [w.shape for w in weights]
+        self._buffer = ctx.RawArray("f", int(sum(w.size for w in weights)))
+        self._version = ctx.RawValue("l", 0)
+        self._epsilon = ctx.RawValue("d", 0.0)
+        self._lock = ctx.Lock()
+
+    @property
+    def version(self):
+        return self._version.value
+
+    def publish(self, weights, epsilon):
+        with self._lock:
+            np.frombuffer(self._buffer, dtype=np.float32)[:] = np.concatenate([w.ravel() for w in weights])
+            self._epsilon.value = epsilon
+            self._version.value += 1
+
+    def read(self):
+        """:return: (weights list, epsilon, version)"""
+        with self._lock:
+            flat = np.frombuffer(self._buffer, dtype=np.float32).copy()
+            epsilon, version = self._epsilon.value, self._version.value
+        weights, offset = [], 0
+        for shape in self.shapes:
+            size = int(np.prod(shape))
+            weights.append(flat[offset:offset + size].reshape(shape))
+            offset += size
+        return weights, epsilon, version
+
+
+def _actor(actor_id, transitions, shared_weights, metrics, env_class, env_kwargs, agent_kwargs, episodes, max_steps,
+           plot_metrics, profile_dir, metrics_dir, record_dir):
+    """Step one environment with the latest broadcast weights and feed transitions to the learner."""
+    from DQNAgent import DQNAgent
+
+    logging.basicConfig(level=logging.INFO)
+    profiler = Profiler(enabled=bool(profile_dir))
+    if metrics_dir:
+        env_kwargs = dict(env_kwargs, metrics_dir=os.path.join(metrics_dir, f"actor_{actor_id}"))
+    if record_dir:
+        env_kwargs = dict(env_kwargs, record_dir=os.path.join(record_dir, f"actor_{actor_id}"))
+    env = env_class(profiler=profiler, **env_kwargs)
+    agent = DQNAgent(state_size=env.state_size, action_size=env.action_size, profiler=profiler, **agent_kwargs)
+    version = -1
+    # Multi-ramp environments return one row per ramp; all ramps act from one batched forward pass
+    multi_ramp = getattr(env, "num_ramps", 1) > 1
+    for episode in range(episodes):
+        logger.info("[actor %d] Starting Episode %d/%d", actor_id, episode + 1, episodes)
+        state = np.reshape(env.reset(), [-1, env.state_size])
+        done = False
+        total_reward = 0
+        step_count = 0
+        while not done:
+            if shared_weights.version != version:
+                weights, agent.epsilon, version = shared_weights.read()
+                agent.inference.set_weights(weights)
+            if multi_ramp:
+                action = agent.act_batch(state)
+            else:
+                action = agent.act(state)
+                logger.debug("Step %d, Q-values: %s", step_count + 1, agent.last_q_values)
+            next_state, reward, done = env.step(action, step_count=step_count, max_steps=max_steps)
+            next_state = np.reshape(next_state, [-1, env.state_size])
+            for k in range(len(state)):
+                transitions.put(state[k], np.ravel(action)[k], np.ravel(reward)[k], next_state[k], done)
+            with metrics.get_lock():
+                metrics[TRANSITIONS] += len(state)
+                metrics[STALENESS_SUM] += shared_weights.version - version
+                metrics[STALENESS_COUNT] += 1
+            state = next_state
+            total_reward += np.sum(reward)
+            step_count += 1
+        logger.info("[actor %d] Episode %d/%d, Total Reward: %s, Steps Taken: %d",
+                    actor_id, episode + 1, episodes, total_reward, step_count)
+        if profile_dir:
+            profiler.write_jsonl(os.path.join(profile_dir, f"actor_{actor_id}.jsonl"))
+    if plot_metrics and hasattr(env, "plot_metrics"):
+        env.plot_metrics()
+    env.close()
+
+
+def _learner(transitions, shared_weights, metrics, stop, state_size, action_size, agent_kwargs, batch_size,
+             broadcast_interval, updates_per_transition, model_path, profile_dir):
+    """
+    Drain the transition queue into replay memory, train and broadcast weights.
+    Once memory holds a batch, every ingested transition decays epsilon once and adds
+    updates_per_transition to the update budget; with the budget used up the learner waits for
+    new transitions. With one actor and a ratio of 1 this follows the single-process schedule of
+    one replay and one epsilon decay per environment step.
+    """
+    from DQNAgent import DQNAgent
+
+    logging.basicConfig(level=logging.INFO)
+    profiler = Profiler(enabled=bool(profile_dir))
+    agent = DQNAgent(state_size=state_size, action_size=action_size, profiler=profiler, **agent_kwargs)
+    shared_weights.publish(agent.model.get_weights(), agent.epsilon)
+    updates = 0
+    budget = 0.0  # Updates allowed by the transitions ingested so far
+    while not (stop.is_set() and len(transitions) == 0):
+        # Only block on the queue when there is no update left to run
+        batch = transitions.get_batch(transitions.capacity, timeout=0.1 if updates >= budget else 0)
+        ingested = len(batch[1])
+        if ingested:
+            agent.remember_batch(*batch)
+            if len(agent.memory) >= batch_size:
+                agent.decay_epsilon(ingested)
+                budget += ingested * updates_per_transition
+        if len(agent.memory) < batch_size or updates >= budget:
+            continue
+        agent.replay(batch_size, decay_epsilon=False)
+        updates += 1
+        with metrics.get_lock():
+            metrics[UPDATES] += 1
+        if updates % broadcast_interval == 0:
+            shared_weights.publish(agent.model.get_weights(), agent.epsilon)
+        if profile_dir and updates % 100 == 0:
+            profiler.write_jsonl(os.path.join(profile_dir, "learner.jsonl"))
+    agent.model.save(model_path)
+    agent.memory.flush()  # Persist a memory-mapped replay buffer's cursor for the next run
+    if profile_dir:
+        profiler.write_jsonl(os.path.join(profile_dir, "learner.jsonl"))
+    logger.info("Training complete. Model saved to %s.", model_path)
+
+
+def run_actor_learner(env_class, env_kwargs, num_actors=1, episodes=1, max_steps=100, batch_size=64,
+                      queue_capacity=1024, broadcast_interval=10, updates_per_transition=1.0, log_interval=5.0,
+                      agent_kwargs=None, model_path="results/dqn_model.h5", plot_metrics=True, profile_dir=None,
+                      metrics_dir=None, record_dir=None):
+    """
+    Train with num_actors actor processes and one learner process.
+    :param env_class: Environment class each actor instantiates with env_kwargs.
+    :param agent_kwargs: DQNAgent arguments; memory_file only applies to the learner's replay memory.
+    :param queue_capacity: Maximum number of transitions waiting for the learner.
+    :param broadcast_interval: Learner updates between weight broadcasts to the actors.
+    :param updates_per_transition: Learner updates allowed per transition ingested.
+    :param log_interval: Seconds between metric reports from the parent process.
+    :param plot_metrics: Let actor 0 plot its environment metrics when it finishes (needs metrics_dir).
+    :param profile_dir: If set, actors and learner profile their hot paths and append snapshots
+        to actor_<i>.jsonl / learner.jsonl in this directory.
+    :param metrics_dir: If set, actor i streams its per-step metrics log to metrics_dir/actor_<i>.
+    :param record_dir: If set, actor i records its transitions as a dataset in record_dir/actor_<i>.
+    :return: Final metrics dict.
+    """
+    from DQNAgent import DQNAgent
+
+    ctx = mp.get_context("spawn")
+    agent_kwargs = agent_kwargs or {}
+    # Only the learner samples replay memory; actors and the template must not open a persistent buffer
+    actor_kwargs = {name: value for name, value in agent_kwargs.items() if name != "memory_file"}
+    if profile_dir:
+        os.makedirs(profile_dir, exist_ok=True)
+    probe = env_class(**env_kwargs)  # Constructing an environment does not launch SUMO
+    state_size, action_size = probe.state_size, probe.action_size
+    template = DQNAgent(state_size, action_size, **actor_kwargs)  # Only used for the weight shapes
+    transitions = SharedTransitionQueue(queue_capacity, state_size, ctx)
+    shared_weights = SharedWeights(template.model.get_weights(), ctx)
+    metrics = ctx.Array("d", 4)
+    stop = ctx.Event()
+
+    learner = ctx.Process(target=_learner, args=(transitions, shared_weights, metrics, stop, state_size, action_size,
+                                                 agent_kwargs, batch_size, broadcast_interval,
+                                                 updates_per_transition, model_path, profile_dir))
+    learner.start()
+    actors = [
+        ctx.Process(target=_actor, args=(i, transitions, shared_weights, metrics, env_class, env_kwargs, actor_kwargs,
+                                         episodes, max_steps, plot_metrics and i == 0, profile_dir,
+                                         metrics_dir, record_dir))
+        for i in range(num_actors)
+    ]
+    for actor in actors:
+        actor.start()
+
+    start = last_time = time.perf_counter()
+    last = list(metrics)
+    while any(actor.is_alive() for actor in actors):
+        learner.join(log_interval)  # Returns early if the learner dies
+        if learner.exitcode is not None:
+            # Nothing drains the queue any more; actors would block on it forever
+            for actor in actors:
+                actor.terminate()
+                actor.join()
+            raise RuntimeError(f"Learner exited with code {learner.exitcode} before the actors finished")
+        now, current = time.perf_counter(), list(metrics)
+        report = pipeline_metrics(current, last, now - last_time, len(transitions))
+        logger.info("[pipeline] queue depth %d, staleness %.2f versions, %.1f transitions/s, %.1f updates/s",
+                    report["queue_depth"], report["mean_staleness"], report["transitions_per_s"],
+                    report["updates_per_s"])
+        last, last_time = current, now
+    for actor in actors:
+        actor.join()
+    stop.set()
+    learner.join()
+    failed = [(i, actor.exitcode) for i, actor in enumerate(actors) if actor.exitcode != 0]
+    if failed:
+        raise RuntimeError("Actors exited with errors: " +
+                           ", ".join(f"actor {i} with code {code}" for i, code in failed))
+    return pipeline_metrics(list(metrics), [0.0] * 4, time.perf_counter() - start, len(transitions))
+
+
+def pipeline_metrics(current, previous, elapsed, queue_depth):
+    """Throughput and staleness between two snapshots of the shared metrics array."""
+    staleness_count = current[STALENESS_COUNT] - previous[STALENESS_COUNT]
+    return {
+        "queue_depth": queue_depth,
+        "transitions": current[TRANSITIONS],
+        "updates": current[UPDATES],
+        "transitions_per_s": (current[TRANSITIONS] - previous[TRANSITIONS]) / elapsed,
+        "updates_per_s": (current[UPDATES] - previous[UPDATES]) / elapsed,
+        "mean_staleness": (current[STALENESS_SUM] - previous[STALENESS_SUM]) / staleness_count if staleness_count else 0.0,
+    }
@@ -0,0 +1,261 @@
+import numpy as np
+from SumoEnvironment import ACTIONS, REWARD_WEIGHTS, WindowMetrics
+
+# Edges of ProjectFinal.net.xml as (length in m, lanes); every lane has a 10 m/s speed limit
+EDGES = {
+    "E5": (102.33, 2),  # Mainline upstream of the merge
+    "E3": (40.39, 3),  # Merge section
+    "E6": (23.43, 2),  # Mainline downstream, exit
+    "E8": (86.61, 1),  # On-ramp approach to the J12 signal
+    "E9": (5.01, 1),  # Ramp stub between J12 and the merge at J5
+}
+
+# Fixed-time program of J12 as (state, duration); take_action overrides the remaining duration
+SIGNAL_PROGRAM = [("G", 22.0), ("y", 3.0), ("r", 5.0)]
+
+
+class CellTransmissionEnvironment:
+    """
+    Macroscopic cell transmission model (Daganzo, 1994) of the ProjectFinal.net.xml ramp network.
+
+    Edges are split into cells no shorter than one free-flow move per substep; every cell of
+    every environment advances in the same array operations, so thousands of ramps can be
+    simulated at once. The J12 signal follows the same program and setPhaseDuration semantics
+    as in SUMO. reset/step/get_state/get_reward mirror SumoEnvironment: with num_envs=1 they
+    return a single state, reward and done; otherwise arrays stacked over environments.
+    """
+
+    def __init__(self, num_envs=1, mainline_demand=0.66, ramp_demand=0.32, free_speed=10.0, lane_capacity=0.35,
+                 jam_spacing=7.5, halt_speed=1.0, dt=0.5, demand_noise=0.0, seed=None):
+        """
+        :param num_envs: Number of independent ramps simulated in parallel.
+        :param mainline_demand: Vehicles per second arriving at the start of E5.
+        :param ramp_demand: Vehicles per second arriving at the start of E8.
+        :param free_speed: Free-flow speed in m/s.
+        :param lane_capacity: Maximum flow per lane in vehicles per second.
+        :param jam_spacing: Road length occupied by one stopped vehicle (length + min gap) in m.
+        :param halt_speed: Cell speed in m/s below which vehicles count as halted for waiting time.
+        :param dt: Substep length in seconds.
+        :param demand_noise: Relative standard deviation of per-substep demand fluctuations.
+        :param seed: Seed for the demand noise.
+        """
+        self.num_envs = num_envs
+        self.mainline_demand = mainline_demand
+        self.ramp_demand = ramp_demand
+        self.free_speed = free_speed
+        self.halt_speed = halt_speed
+        self.dt = dt
+        self.demand_noise = demand_noise
+        self.rng = np.random.default_rng(seed)
+        self.state_size = 3
+        self.action_size = len(ACTIONS)
+        self.reward_edges = ["E5", "E3", "E6", "E8", "E9"]
+
+        # Lay the cells of all edges out in one axis; cell lengths satisfy free_speed * dt <= length
+        self.edge_cells = {}
+        lengths, lanes = [], []
+        for edge, (length, n_lanes) in EDGES.items():
+            count = max(1, int(length // (free_speed * dt)))
+            self.edge_cells[edge] = np.arange(len(lengths), len(lengths) + count)
+            lengths += [length / count] * count
+            lanes += [n_lanes] * count
+        lengths, lanes = np.array(lengths), np.array(lanes)
+        self.num_cells = len(lengths)
+        self.lanes = lanes
+        self.move_fraction = free_speed * dt / lengths  # Share of a cell's vehicles leaving at free flow
+        self.capacity = lane_capacity * lanes * dt  # Max vehicles crossing a cell boundary per substep
+        self.jam_vehicles = lengths * lanes / jam_spacing  # Vehicles fitting in a fully jammed cell
+        wave_speed = lane_capacity / (1.0 / jam_spacing - lane_capacity / free_speed)
+        self.wave_fraction = wave_speed * dt / lengths
+
+        # Links between consecutive cells inside an edge plus E3 -> E6; the merge and the signal are special
+        upstream, downstream = [], []
+        for edge in EDGES:
+            cells = self.edge_cells[edge]
+            upstream += list(cells[:-1])
+            downstream += list(cells[1:])
+        upstream.append(self.edge_cells["E3"][-1])
+        downstream.append(self.edge_cells["E6"][0])
+        self.link_up, self.link_down = np.array(upstream), np.array(downstream)
+        self.merge_main, self.merge_ramp = self.edge_cells["E5"][-1], self.edge_cells["E9"][0]
+        self.merge_into = self.edge_cells["E3"][0]
+        self.merge_priority = EDGES["E5"][1] / (EDGES["E5"][1] + EDGES["E9"][1])
+        self.signal_up, self.signal_down = self.edge_cells["E8"][-1], self.edge_cells["E9"][0]
+        self.exit_cell = self.edge_cells["E6"][-1]
+
+        self.reset()
+
+    def reset(self):
+        """Reset every ramp to an empty network at the start of the signal program."""
+        n = self.num_envs
+        self.vehicles = np.zeros((n, self.num_cells))
+        self.entry_queue = np.zeros((n, 2))  # Vehicles waiting to enter E5 and E8
+        self.phase = np.zeros(n, dtype=np.int64)
+        self.phase_remaining = np.full(n, SIGNAL_PROGRAM[0][1])
+        self.halted = np.zeros((n, len(EDGES)))  # Halted vehicles per edge
+        self.mean_wait = np.zeros((n, len(EDGES)))  # Mean current waiting time of halted vehicles per edge
+        self.time = np.zeros(n)
+        self.cumulative_reward = np.zeros(n)
+        self.window = None
+        return self._squeeze(self.get_state())
+
+    def _advance_signal(self, active):
+        self.phase_remaining -= self.dt * active
+        switch = self.phase_remaining <= 0
+        if switch.any():
+            self.phase[switch] = (self.phase[switch] + 1) % len(SIGNAL_PROGRAM)
+            durations = np.array([duration for _, duration in SIGNAL_PROGRAM])
+            self.phase_remaining[switch] += durations[self.phase[switch]]
+
+    def _substep(self, active):
+        """
+        Advance the active ramps by dt seconds.
+        :return: (vehicles leaving E6, vehicles delayed per cell, vehicles halted per cell) for this substep.
+        """
+        n = self.vehicles
+        sending = np.minimum(self.move_fraction * n, self.capacity)
+        receiving = np.minimum(self.capacity, self.wave_fraction * (self.jam_vehicles - n))
+        inflow = np.zeros_like(n)
+        outflow = np.zeros_like(n)
+
+        # Ordinary links
+        flow = np.minimum(sending[:, self.link_up], receiving[:, self.link_down])
+        outflow[:, self.link_up] += flow
+        inflow[:, self.link_down] += flow
+
+        # J12 signal: only the green phase lets vehicles through
+        green = self.phase == 0
+        flow = np.where(green, np.minimum(sending[:, self.signal_up], receiving[:, self.signal_down]), 0.0)
+        outflow[:, self.signal_up] += flow
+        inflow[:, self.signal_down] += flow
+
+        # J5 merge: the mainline gets a lane-proportional share of E3's receiving capacity when it binds
+        s_main, s_ramp = sending[:, self.merge_main], sending[:, self.merge_ramp]
+        r = receiving[:, self.merge_into]
+        y_main = np.median(np.stack([s_main, r - s_ramp, self.merge_priority * r]), axis=0)
+        free = s_main + s_ramp <= r
+        y_main = np.where(free, s_main, y_main)
+        y_ramp = np.where(free, s_ramp, r - y_main)
+        outflow[:, self.merge_main] += y_main
+        outflow[:, self.merge_ramp] += y_ramp
+        inflow[:, self.merge_into] += y_main + y_ramp
+
+        # Free exit at the end of E6
+        exit_flow = sending[:, self.exit_cell]
+        outflow[:, self.exit_cell] += exit_flow
+
+        # Entries with vertical queues, like SUMO's insertion backlog
+        demand = np.array([self.mainline_demand, self.ramp_demand]) * self.dt
+        if self.demand_noise:
+            demand = demand * np.maximum(0.0, 1.0 + self.demand_noise * self.rng.standard_normal((self.num_envs, 2)))
+        self.entry_queue += demand * active[:, None]
+        for column, cell in enumerate((self.edge_cells["E5"][0], self.edge_cells["E8"][0])):
+            entering = np.minimum(self.entry_queue[:, column], receiving[:, cell])
+            self.entry_queue[:, column] -= entering
+            inflow[:, cell] += entering
+
+        # Vehicles that would have left at free flow but did not are delayed for this substep
+        free_outflow = self.move_fraction * n
+        delayed = np.maximum(free_outflow - outflow, 0.0) / self.move_fraction
+        # Cell speed relative to free flow; vehicles count as halted as the speed drops below halt_speed
+        relative_speed = np.divide(outflow, free_outflow, out=np.ones_like(n), where=free_outflow > 1e-9)
+        halted = n * np.clip(1.0 - relative_speed * self.free_speed / self.halt_speed, 0.0, 1.0)
+        self.vehicles = np.where(active[:, None], n + inflow - outflow, n)
+        return exit_flow * active, delayed * active[:, None], halted * active[:, None]
+
+    def _update_waiting(self, halted, active):
+        """Track halted vehicles and their mean waiting time per edge, as SUMO's edge waiting time does."""
+        halted = np.stack([halted[:, cells].sum(axis=1) for cells in self.edge_cells.values()], axis=1)
+        staying = np.minimum(self.halted, halted)
+        total_wait = staying * (self.mean_wait + 1.0) + (halted - staying)
+        mean_wait = np.divide(total_wait, halted, out=np.zeros_like(halted), where=halted > 1e-9)
+        self.mean_wait = np.where(active[:, None], mean_wait, self.mean_wait)
+        self.halted = np.where(active[:, None], halted, self.halted)
+
+    def macro_step(self, duration):
+        """
+        Advance each ramp by its own duration (scalar or one per environment) in seconds.
+        :return: WindowMetrics whose fields are arrays over environments.
+        """
+        durations = np.broadcast_to(np.asarray(duration, dtype=np.float64), (self.num_envs,))
+        passed = np.zeros(self.num_envs)
+        delay = np.zeros(self.num_envs)
+        max_queue = self._queue_length()
+        substeps = int(round(1.0 / self.dt))
+        for second in range(int(durations.max())):
+            active = second < durations
+            halted = np.zeros((self.num_envs, self.num_cells))
+            for _ in range(substeps):
+                self._advance_signal(active)
+                exit_flow, delayed, halted_substep = self._substep(active)
+                passed += exit_flow
+                delay += delayed.sum(axis=1) * self.dt
+                halted += halted_substep / substeps
+            self._update_waiting(halted, active)
+            self.time += active
+            max_queue = np.where(active, np.maximum(max_queue, self._queue_length()), max_queue)
+        self.window = WindowMetrics(duration=durations, vehicles_passed=passed, delay=delay, max_queue=max_queue)
+        return self.window
+
+    def take_action(self, action):
+        """Apply one action per environment: set the remaining duration of the current phase, as SUMO does."""
+        actions = np.broadcast_to(np.asarray(action), (self.num_envs,))
+        green = np.array([plan["green_duration"] for plan in ACTIONS], dtype=np.float64)[actions]
+        red = np.array([plan["red_duration"] for plan in ACTIONS])[actions]
+        self.phase_remaining = green
+        return self.macro_step(red)
+
+    def _edge_vehicles(self, edge):
+        return self.vehicles[:, self.edge_cells[edge]].sum(axis=1)
+
+    def _lane_vehicles(self, lane):
+        edge = lane.split("_")[0]
+        return self._edge_vehicles(edge) / EDGES[edge][1]
+
+    def _queue_length(self):
+        return sum(self._lane_vehicles(lane) for lane in ("E9_0", "E5_0", "E6_0", "E8_0"))
+
+    def get_state(self):
+        """:return: (num_envs, 3) array of [traffic density on E3_1, waiting time on E8, vehicles on E9_0]."""
+        density = self._lane_vehicles("E3_1") / EDGES["E3"][0]
+        waiting_time = self.halted[:, list(EDGES).index("E8")] * self.mean_wait[:, list(EDGES).index("E8")]
+        queue_length = self._lane_vehicles("E9_0")
+        return np.stack([density, waiting_time, queue_length], axis=1)
+
+    def get_reward(self):
+        """Same weighted terms as SumoEnvironment.get_reward, one value per environment."""
+        if self.window is not None:
+            total_flow = self.window.vehicles_passed / self.window.duration
+            total_waiting_time = self.window.delay / self.window.duration
+            total_queue_length = self.window.max_queue
+        else:
+            total_flow = sum(self._edge_vehicles(edge) for edge in self.reward_edges)
+            total_waiting_time = (self.halted * self.mean_wait).sum(axis=1)
+            total_queue_length = self._queue_length()
+        reward = (
+            REWARD_WEIGHTS["flow_rate"] * total_flow +
+            REWARD_WEIGHTS["waiting_time"] * total_waiting_time +
+            REWARD_WEIGHTS["queue_length"] * total_queue_length
+        )
+        return reward / len(self.reward_edges)
+
+    def step(self, action, step_count, max_steps=100):
+        """
+        Apply the action(s), advance through the action window and return state, reward and done.
+        :param action: Action index, or one index per environment.
+        """
+        self.take_action(action)
+        state = self.get_state()
+        reward = self.get_reward()
+        self.cumulative_reward += reward
+        done = np.full(self.num_envs, step_count >= max_steps)
+        return self._squeeze(state), self._squeeze(reward), self._squeeze(done)
+
+    def _squeeze(self, values):
+        """Drop the environment axis when simulating a single ramp, matching SumoEnvironment."""
+        if self.num_envs == 1:
+            return values[0].item() if np.ndim(values) == 1 else values[0]
+        return values
+
+    def close(self):
+        """Nothing to release; present for interface compatibility."""
@@ -1,21 +1,62 @@
+import logging
 import numpy as np
 import random
-from collections import deque
 from keras.models import Sequential
 from keras.layers import Dense
 from keras.optimizers import Adam
+from ReplayBuffer import ReplayBuffer
+from PrioritizedReplayBuffer import PrioritizedReplayBuffer
+from NumpyQNetwork import NumpyQNetwork
+from Instrumentation import NULL_PROFILER
+
+logger = logging.getLogger(__name__)
 
 class DQNAgent:
-    def __init__(self, state_size, action_size):
+    def __init__(self, state_size, action_size, batched_replay=True, target_update_freq=100, tau=None,
+                 memory_size=2000, memory_file=None, prioritized_replay=False, alpha=0.6, beta=0.4,
+                 beta_increment=0.001, gamma=0.95, epsilon=0.3, epsilon_min=0.01, epsilon_decay=0.95,
+                 learning_rate=0.001, profiler=None):
+        """
+        :param state_size: Number of features in a state.
+        :param action_size: Number of discrete actions.
+        :param batched_replay: Train on the whole minibatch in one gradient step (False keeps the per-sample path).
+        :param target_update_freq: Number of batched updates between hard target network syncs.
+        :param tau: If set, Polyak-average the target network by this factor after every update instead.
+        :param memory_size: Capacity of the replay buffer.
+        :param memory_file: Optional directory for a memory-mapped, persistent replay buffer.
+        :param prioritized_replay: Sample transitions proportionally to their TD error instead of uniformly.
+        :param alpha: Prioritization exponent (prioritized replay only).
+        :param beta: Initial importance-sampling exponent, annealed to 1 by beta_increment per replay.
+        :param beta_increment: Amount added to beta after every sampled minibatch.
+        :param gamma: Discount factor.
+        :param epsilon: Initial exploration rate, multiplied by epsilon_decay after every replay down to epsilon_min.
+        :param learning_rate: Adam learning rate.
+        :param profiler: Optional Instrumentation.Profiler timing act and replay.
+        """
         self.state_size = state_size
         self.action_size = action_size
-        self.memory = deque(maxlen=2000)
-        self.gamma = 0.95  # Discount factor
-        self.epsilon = 0.3  # Exploration rate
-        self.epsilon_min = 0.01  # Minimum epsilon value
-        self.epsilon_decay = 0.95  # Decay factor for epsilon
-        self.learning_rate = 0.001
+        self.profiler = profiler or NULL_PROFILER
+        self.prioritized_replay = prioritized_replay
+        if prioritized_replay:
+            self.memory = PrioritizedReplayBuffer(memory_size, state_size, alpha=alpha, beta=beta,
+                                                  beta_increment=beta_increment, filename=memory_file)
+        else:
+            self.memory = ReplayBuffer(memory_size, state_size, filename=memory_file)
+        self.gamma = gamma  # Discount factor
+        self.epsilon = epsilon  # Exploration rate
+        self.epsilon_min = epsilon_min  # Minimum epsilon value
+        self.epsilon_decay = epsilon_decay  # Decay factor for epsilon
+        self.learning_rate = learning_rate
+        self.batched_replay = batched_replay
+        self.target_update_freq = target_update_freq
+        self.tau = tau
+        self.train_steps = 0  # Number of gradient updates performed
         self.model = self._build_model()
+        self.target_model = self._build_model()  # Used for bootstrapped targets in batched replay
+        self.update_target_model()
+        self.inference = NumpyQNetwork()  # NumPy mirror of self.model used for acting
+        self.inference.sync_from(self.model)
+        self.last_q_values = None  # Q-values computed by the last call to act
 
     def _build_model(self):
         model = Sequential()
@@ -25,35 +66,138 @@ class DQNAgent:
         model.compile(loss='mse', optimizer=Adam(learning_rate=self.learning_rate))
         return model
 
-    def act(self, state):
-        if np.random.rand() <= self.epsilon:
-            action = random.randrange(self.action_size)
-            print(f"Exploration: Random action {action}")
-            return action
+    def update_target_model(self):
+        """Copy (or Polyak-average, when tau is set) the online weights into the target network."""
+        if self.tau is None:
+            self.target_model.set_weights(self.model.get_weights())
         else:
-            q_values = self.model.predict(state)
-            action = np.argmax(q_values[0])
-            print(f"Exploitation: Q-values {q_values}, Action {action}")
-            return action
+            self.target_model.set_weights([
+                self.tau * w + (1.0 - self.tau) * tw
+                for w, tw in zip(self.model.get_weights(), self.target_model.get_weights())
+            ])
+
+    def act(self, state, greedy=False):
+        """
+        Epsilon-greedy action for one state.
+        :param greedy: Always exploit, e.g. for evaluation.
+        """
+        # Q-values are computed once per step with the NumPy mirror and kept for logging
+        with self.profiler.phase("agent.act"):
+            q_values = self.inference.predict(state)
+            self.last_q_values = q_values
+            if not greedy and np.random.rand() <= self.epsilon:
+                action = random.randrange(self.action_size)
+                logger.debug("Exploration: Random action %d", action)
+                return action
+            else:
+                action = np.argmax(q_values[0])
+                logger.debug("Exploitation: Q-values %s, Action %d", q_values, action)
+                return action
+
+    def act_batch(self, states):
+        """
+        Epsilon-greedy actions for a batch of states using a single forward pass.
+        :param states: Array of shape (n, state_size), e.g. from VectorizedSumoEnvironment.
+        :return: Array of n action indices.
+        """
+        q_values = self.inference.predict_batch(states)
+        actions = np.argmax(q_values, axis=1)
+        explore = np.random.rand(len(actions)) <= self.epsilon
+        actions[explore] = np.random.randint(self.action_size, size=int(explore.sum()))
+        return actions
 
     def remember(self, state, action, reward, next_state, done):
         """Stores experiences in memory."""
-        self.memory.append((state, action, reward, next_state, done))
+        self.memory.add(state, action, reward, next_state, done)
 
-    def replay(self, batch_size):
+    def remember_batch(self, states, actions, rewards, next_states, dones):
+        """Stores one transition per environment in memory."""
+        self.memory.add_batch(states, actions, rewards, next_states, dones)
+
+    def replay(self, batch_size, decay_epsilon=True):
+        """
+        Train on one minibatch sampled from memory.
+        :param decay_epsilon: Decay epsilon once, i.e. once per environment step when replay is called
+            after every step; the actor/learner pipeline decays it per ingested transition instead.
+        """
         if len(self.memory) < batch_size:
             return
-        batch = random.sample(self.memory, batch_size)
-        for state, action, reward, next_state, done in batch:
+        with self.profiler.phase("agent.replay"):
+            batch = self.memory.sample(batch_size)
+            if self.batched_replay:
+                self._replay_batch(batch)
+            else:
+                self._replay_per_sample(batch)
+            self.inference.sync_from(self.model)
+        self.profiler.count("updates")
+
+        if decay_epsilon:
+            self.decay_epsilon()
+
+    def decay_epsilon(self, steps=1):
+        """Apply `steps` epsilon decays at once, stopping at epsilon_min."""
+        if self.epsilon > self.epsilon_min:
+            self.epsilon = max(self.epsilon_min, self.epsilon * self.epsilon_decay ** steps)
+        logger.debug("Epsilon: %s", self.epsilon)
+
+    def train_offline(self, dataset, batch_size=64, epochs=1, seed=None, prefetch=4, sync_interval=100):
+        """
+        Train on a recorded TransitionDataset instead of replay memory, without any simulator.
+        Minibatches stream from the memory-mapped shards through a prefetching generator and take the
+        same batched gradient step as replay(); epsilon is left untouched.
+        :param sync_interval: Updates between refreshes of the NumPy inference copy used by act.
+        :return: Number of gradient updates performed.
+        """
+        updates = 0
+        for batch in dataset.batches(batch_size, epochs=epochs, seed=seed, prefetch=prefetch):
+            with self.profiler.phase("agent.replay"):
+                self._replay_batch(batch)
+            self.profiler.count("updates")
+            updates += 1
+            if updates % sync_interval == 0:
+                self.inference.sync_from(self.model)
+        self.inference.sync_from(self.model)
+        logger.info("Offline training: %d updates over %d transitions", updates, len(dataset) * epochs)
+        return updates
+
+    def _replay_per_sample(self, batch):
+        """Original replay path: two predicts and one fit per transition, bootstrapping from the online model."""
+        states, actions, rewards, next_states, dones = batch[:5]
+        td_errors = np.zeros(len(actions), dtype=np.float32)
+        for i in range(len(actions)):
+            state, next_state = states[i:i + 1], next_states[i:i + 1]
+            action, reward, done = actions[i], rewards[i], dones[i]
             target = reward
             if not done:
                 target += self.gamma * np.max(self.model.predict(next_state)[0])
             target_f = self.model.predict(state)
+            td_errors[i] = target - target_f[0][action]
             target_f[0][action] = target
-            self.model.fit(state, target_f, epochs=1, verbose=0)
+            sample_weight = batch[6][i:i + 1] if self.prioritized_replay else None
+            self.model.fit(state, target_f, sample_weight=sample_weight, epochs=1, verbose=0)
+        if self.prioritized_replay:
+            self.memory.update_priorities(batch[5], td_errors)
 
-        # Log epsilon updates
-        if self.epsilon > self.epsilon_min:
-            self.epsilon *= self.epsilon_decay
-        print(f"Epsilon: {self.epsilon}")
+    def _replay_batch(self, batch):
+        """Take a single gradient step on the stacked minibatch, bootstrapping from the target network."""
+        states, actions, rewards, next_states, dones = batch[:5]
+
+        with self.profiler.phase("agent.predict"):
+            next_q = self.target_model.predict_on_batch(next_states)
+            target_f = np.array(self.model.predict_on_batch(states))
+        targets = rewards + self.gamma * np.max(next_q, axis=1) * (1.0 - dones.astype(np.float32))
+        rows = np.arange(len(actions))
+        if self.prioritized_replay and len(batch) > 5:
+            indices, weights = batch[5], batch[6]
+            self.memory.update_priorities(indices, targets - target_f[rows, actions])
+            target_f[rows, actions] = targets
+            with self.profiler.phase("agent.fit"):
+                self.model.train_on_batch(states, target_f, sample_weight=weights)
+        else:
+            target_f[rows, actions] = targets
+            with self.profiler.phase("agent.fit"):
+                self.model.train_on_batch(states, target_f)
 
+        self.train_steps += 1
+        if self.tau is not None or self.train_steps % self.target_update_freq == 0:
+            self.update_target_model()
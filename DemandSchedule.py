@@ -0,0 +1,90 @@
+import numpy as np
+
+HIGH_TRAFFIC = "High Traffic"
+LOW_TRAFFIC = "Low Traffic"
+
+
+class DemandSchedule:
+    """
+    Seeded, reproducible high/low traffic schedule for the dynamic vehicles of an episode.
+
+    Simulation time is split into buckets of `interval` seconds. Each bucket is high traffic with
+    probability high_probability, in which case high_vehicles_per_lane vehicles depart on every
+    lane at its start; otherwise a single vehicle departs on a random lane. The schedule is keyed
+    by simulation time, not by agent step, so the same seed always yields the same vehicles at the
+    same times whatever signal plans a policy picks, and two policies evaluated with the same seed
+    see identical demand.
+    """
+
+    def __init__(self, seed=None, route_id="E5_to_E6_via_E3", lanes=(0, 1), high_probability=0.5,
+                 high_vehicles_per_lane=5, interval=15.0, horizon=256):
+        """
+        :param seed: Seed (or sequence of ints, e.g. (seed, episode)) for the generator; None is not reproducible.
+        :param route_id: Route the dynamic vehicles follow.
+        :param lanes: Departure lane indices.
+        :param high_probability: Probability that a bucket is high traffic.
+        :param high_vehicles_per_lane: Vehicles departing on each lane in a high traffic bucket.
+        :param interval: Simulated seconds per bucket.
+        :param horizon: Number of buckets drawn at a time.
+        """
+        self.rng = np.random.default_rng(seed)
+        self.route_id = route_id
+        self.lanes = np.asarray(lanes)
+        self.high_probability = high_probability
+        self.high_vehicles_per_lane = high_vehicles_per_lane
+        self.interval = float(interval)
+        self.horizon = horizon
+        self.high = np.zeros(0, dtype=bool)  # Traffic status per bucket
+        self.low_lanes = np.zeros(0, dtype=np.int64)  # Lane of the single low-traffic vehicle per bucket
+        self._high_lanes = np.repeat(self.lanes, high_vehicles_per_lane)
+
+    def _extend(self, buckets):
+        while len(self.high) < buckets:
+            # Draw both arrays for every bucket so the sequence does not depend on the statuses drawn
+            self.high = np.concatenate([self.high, self.rng.random(self.horizon) < self.high_probability])
+            self.low_lanes = np.concatenate([self.low_lanes, self.rng.choice(self.lanes, size=self.horizon)])
+
+    def bucket(self, time):
+        """:return: Index of the bucket containing simulation time `time`."""
+        return int(time // self.interval)
+
+    def status(self, time):
+        """:return: HIGH_TRAFFIC or LOW_TRAFFIC at simulation time `time`."""
+        bucket = self.bucket(time)
+        self._extend(bucket + 1)
+        return HIGH_TRAFFIC if self.high[bucket] else LOW_TRAFFIC
+
+    def departures(self, begin, end):
+        """
+        Every scheduled vehicle departing in [begin, end), in departure order.
+        :return: (depart times, departure lanes, whether each vehicle belongs to a high traffic bucket) arrays.
+        """
+        first = max(0, int(np.ceil(begin / self.interval)))
+        last = int(np.ceil(end / self.interval))  # Exclusive
+        self._extend(last)
+        times, lanes, high = [], [], []
+        for bucket in range(first, last):
+            bucket_lanes = self._high_lanes if self.high[bucket] else self.low_lanes[bucket:bucket + 1]
+            times.append(np.full(len(bucket_lanes), bucket * self.interval))
+            lanes.append(bucket_lanes)
+            high.append(np.full(len(bucket_lanes), self.high[bucket]))
+        if not times:
+            return np.zeros(0), np.zeros(0, dtype=np.int64), np.zeros(0, dtype=bool)
+        return np.concatenate(times), np.concatenate(lanes), np.concatenate(high)
+
+    def write_route_file(self, path, end, begin=0.0, vehicle_prefix="dynamic_car_"):
+        """
+        Export the vehicles departing in [begin, end) as a SUMO route file, one <vehicle> per vehicle.
+        IDs are numbered in departure order, as DynamicFlowSumoEnvironment numbers the vehicles it injects,
+        and lane changes are disabled through a vType (otherwise DEFAULT_VEHTYPE of ProjetRL.rou.xml),
+        matching the lane hold of injected vehicles.
+        """
+        times, lanes, _ = self.departures(begin, end)
+        with open(path, "w") as f:
+            f.write('<?xml version="1.0" encoding="UTF-8"?>\n<routes>\n')
+            f.write('    <vType id="dynamic_lane_hold" vClass="trailer" lcStrategic="-1" lcCooperative="-1" '
+                    'lcSpeedGain="0" lcKeepRight="0"/>\n')
+            for counter, (depart, lane) in enumerate(zip(times, lanes)):
+                f.write(f'    <vehicle id="{vehicle_prefix}{counter}" type="dynamic_lane_hold" '
+                        f'route="{self.route_id}" depart="{float(depart):.2f}" departLane="{int(lane)}"/>\n')
+            f.write("</routes>\n")
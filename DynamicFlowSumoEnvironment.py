@@ -1,239 +1,156 @@
+import logging
 import os
 import sys
-import traci
 import numpy as np
-import random
-from SumoEnvironment import SumoEnvironment
-import matplotlib.pyplot as plt
-from matplotlib.patches import Patch
+from SumoEnvironment import SumoEnvironment, ACTIONS
+from DemandSchedule import DemandSchedule, HIGH_TRAFFIC, LOW_TRAFFIC
+from MetricsLog import MetricsWriter
+from TransitionDataset import TransitionRecorder
+
+logger = logging.getLogger(__name__)
 
 class DynamicFlowSumoEnvironment(SumoEnvironment):
-    def __init__(self, sumo_cfg_file, traffic_light_id):
-        super().__init__(sumo_cfg_file, traffic_light_id)
+    def __init__(self, sumo_cfg_file, traffic_light_id, demand_seed=None, high_traffic_probability=0.5,
+                 demand_interval=15.0, metrics_dir=None, record_dir=None, **kwargs):
+        """
+        :param demand_seed: Seed of the per-episode demand schedules; episode i uses (demand_seed, i).
+        :param high_traffic_probability: Probability that a demand interval is high traffic.
+        :param demand_interval: Simulated seconds per high/low traffic draw of the demand schedule.
+        :param metrics_dir: If set, per-step metrics are streamed to a columnar log in this directory
+            (see MetricsLog.py); plot_metrics and plot_metrics.py read it back.
+        :param record_dir: If set, every (state, action, reward, next_state, done) transition is recorded
+            to a sharded dataset in this directory for offline training (see TransitionDataset.py).
+        :param kwargs: Forwarded to SumoEnvironment (backend, warmup_steps, ...).
+        """
+        super().__init__(sumo_cfg_file, traffic_light_id, **kwargs)
+        self.demand_seed = demand_seed
+        self.high_traffic_probability = high_traffic_probability
+        self.demand_interval = demand_interval
+        self.episode = 0  # Index of the next episode, used to derive its demand seed
+        self.demand = None  # DemandSchedule of the current episode
         self.time_step = 0  # Track the simulation time step
         self.cumulative_reward = 0  # Initialize cumulative reward
         self.current_status = ""  # Store the current traffic status
         self.previous_status = ""  # Track the previous status
-        self.traffic_status = []
-        self.traffic_variation = [] 
         self.high_traffic_count = 0  # Count cars during high traffic
         self.low_traffic_count = 0  # Count cars during low traffic
+        self.vehicles_added = 0  # Cars injected for the current action window
         self.vehicle_counter = 0  # Unique vehicle ID counter
-        self.actions_taken = []
-
-
-        # Add lists to track metrics
-        self.waiting_times = []  # Track total waiting time
-        self.rewards = []  # Track rewards
-        self.actions = []  # Track actions
-
-    def adjust_traffic_flow(self):
-        # Determine traffic condition
-        if random.random() > 0.5:
-            self.current_status = "High Traffic"
-            if self.current_status != self.previous_status:
-                if self.previous_status == "Low Traffic":
-                    print(f"Low Traffic -> Total Cars Added: {self.low_traffic_count}")
-                    self.low_traffic_count = 0
-                elif self.previous_status == "High Traffic":
-                    print(f"High Traffic -> Total Cars Added: {self.high_traffic_count}")
-                    self.high_traffic_count = 0
-
-            # Add cars and update counts for high traffic
-            for lane_index in [0, 1]:
-                for _ in range(5):
-                    vehicle_id = f"dynamic_car_{self.vehicle_counter}"
-                    self.vehicle_counter += 1
-                    try:
-                        traci.vehicle.add(vehicle_id, routeID="E5_to_E6_via_E3", depart=traci.simulation.getTime())
-                        traci.vehicle.changeLane(vehicle_id, lane_index, duration=1000.0)
-                        self.high_traffic_count += 1
-                    except traci.TraCIException:
-                        pass
-        else:
-            self.current_status = "Low Traffic"
-            if self.current_status != self.previous_status:
-                if self.previous_status == "High Traffic":
-                    print(f"High Traffic -> Total Cars Added: {self.high_traffic_count}")
-                    self.high_traffic_count = 0
-                elif self.previous_status == "Low Traffic":
-                    print(f"Low Traffic -> Total Cars Added: {self.low_traffic_count}")
-                    self.low_traffic_count = 0
-
-            # Add cars and update counts for low traffic
-            lane_index = random.choice([0, 1])
+
+        # Per-step metrics go to disk in chunks instead of growing lists
+        self.metrics_dir = metrics_dir
+        self.metrics = None
+        if metrics_dir is not None:
+            self.metrics = MetricsWriter(metrics_dir, metadata={"action_labels": [str(a) for a in ACTIONS]})
+
+        self.recorder = None
+        if record_dir is not None:
+            self.recorder = TransitionRecorder(record_dir, self.state_size, action_size=self.action_size)
+        self.last_state = None  # State the next recorded transition starts from
+
+    def adjust_traffic_flow(self, duration):
+        """
+        Inject every scheduled vehicle departing in the next `duration` seconds in one batch, each with its
+        own depart time. Lane changes are disabled per vehicle so it stays on its departure lane.
+        """
+        self.current_status = self.demand.status(self.sim_time)
+        if self.current_status != self.previous_status:
+            if self.previous_status == LOW_TRAFFIC:
+                logger.info("Low Traffic -> Total Cars Added: %d", self.low_traffic_count)
+                self.low_traffic_count = 0
+            elif self.previous_status == HIGH_TRAFFIC:
+                logger.info("High Traffic -> Total Cars Added: %d", self.high_traffic_count)
+                self.high_traffic_count = 0
+
+        departs, lanes, high = self.demand.departures(self.sim_time, self.sim_time + duration)
+        added = 0
+        for depart, lane_index, is_high in zip(departs.tolist(), lanes.tolist(), high.tolist()):
             vehicle_id = f"dynamic_car_{self.vehicle_counter}"
             self.vehicle_counter += 1
             try:
-                traci.vehicle.add(vehicle_id, routeID="E5_to_E6_via_E3", depart=traci.simulation.getTime())
-                traci.vehicle.changeLane(vehicle_id, lane_index, duration=1000.0)
+                self.traci.vehicle.add(vehicle_id, routeID=self.demand.route_id, depart=depart,
+                                       departLane=str(lane_index))
+                self.traci.vehicle.setLaneChangeMode(vehicle_id, 0)
+            except self.traci.TraCIException:
+                continue
+            added += 1
+            if is_high:
+                self.high_traffic_count += 1
+            else:
                 self.low_traffic_count += 1
-            except traci.TraCIException:
-                pass
-
-        # Update traffic status and variation
-        self.traffic_status.append(self.current_status)
-        self.traffic_variation.append({
-            "High Traffic": self.high_traffic_count,
-            "Low Traffic": self.low_traffic_count
-        })
+        self.vehicles_added = added
         self.previous_status = self.current_status
 
-
-       
-
+    def reset(self):
+        """Reset the environment, the per-episode step counter and the episode's demand schedule."""
+        self.time_step = 0
+        seed = None if self.demand_seed is None else (self.demand_seed, self.episode)
+        self.demand = DemandSchedule(seed=seed, high_probability=self.high_traffic_probability,
+                                     interval=self.demand_interval)
+        self.episode += 1
+        self.last_state = super().reset()
+        return self.last_state
 
     def apply_action(self, action):
         """
         Apply the selected action to the traffic light.
+        Kept for compatibility; identical to take_action, which step already calls once.
         :param action: Action index corresponding to a traffic light configuration.
         """
-        actions = [
-            {"green_duration": 5, "red_duration": 25},
-            {"green_duration": 10, "red_duration": 20},
-            {"green_duration": 15, "red_duration": 15},
-            {"green_duration": 20, "red_duration": 10},
-            {"green_duration": 25, "red_duration": 5},
-        ]
-        selected_action = actions[action]
-        traci.trafficlight.setPhaseDuration(self.traffic_light_id, selected_action["green_duration"])
-        
-        # Simulate for the red duration
-        for _ in range(selected_action["red_duration"]):
-            traci.simulationStep()
+        return self.take_action(action)
 
     def step(self, action, step_count, max_steps):
         """ Perform a step and track metrics. """
         self.time_step += 1  # Update the simulation step
-        self.adjust_traffic_flow()  # Adjust traffic flow dynamically
+        with self.profiler.phase("env.inject_vehicles"):
+            self.adjust_traffic_flow(ACTIONS[action]["red_duration"])  # Vehicles departing during the window
 
-        # Apply the action
+        # Apply the action once and advance through its window
         self.take_action(action)
-        self.apply_action(action)
-
-        # Run the simulation step
-        traci.simulationStep()
 
-        # Get the new state and reward
-        state = self.get_state()
-        reward = self.get_reward()
+        with self.profiler.phase("env.observe"):
+            # Get the new state and reward
+            state = self.get_state()
+            reward = self.get_reward()
+        self.profiler.count("env_steps")
 
         # Update cumulative reward
         self.cumulative_reward += reward
 
         # Log metrics
-        self.actions.append(action)
-        self.rewards.append(reward)
-        self.waiting_times.append(self.get_state()[1])  # Waiting time is the second element in the state
-        self.actions_taken.append(action)
-
-        # Log action and cumulative reward at each step
-        print(f"Time Step: {self.time_step}, Action: {action}, Reward: {reward}, Cumulative Reward: {self.cumulative_reward}")
+        if self.metrics is not None:
+            self.metrics.append(episode=self.episode - 1, step=self.time_step, action=action, reward=reward,
+                                traffic_density=state[0], waiting_time=state[1], queue_length=state[2],
+                                high_traffic=self.current_status == HIGH_TRAFFIC, vehicles_added=self.vehicles_added)
 
         # Set 'done' flag after a number of steps
         done = self.time_step >= max_steps
 
+        if self.recorder is not None:
+            self.recorder.add(self.last_state, action, reward, state, done)
+        self.last_state = state
+
+        # Log action and cumulative reward at each step
+        logger.debug("Time Step: %d, Action: %d, Reward: %s, Cumulative Reward: %s",
+                     self.time_step, action, reward, self.cumulative_reward)
+
         return state, reward, done
 
-    def plot_metrics(self):
-        """Plot metrics after the simulation ends."""
-        # Ensure that metrics lists are not empty
-        if len(self.waiting_times) == 0 or len(self.rewards) == 0 or len(self.actions) == 0:
-            print("Metrics data is empty, check data collection in the simulation.")
+    def plot_metrics(self, output_dir="results/plots"):
+        """Flush the metrics log and plot it headlessly (see plot_metrics.py)."""
+        if self.metrics is None:
+            logger.warning("No metrics log to plot, construct the environment with metrics_dir.")
             return
-
-        # Plot waiting times
-        plt.figure(figsize=(12, 6))
-        plt.bar(range(len(self.waiting_times)), self.waiting_times, color='blue', alpha=0.7)
-        plt.xlabel("Time Step")
-        plt.ylabel("Waiting Time")
-        plt.title("Waiting Time per Step")
-        plt.savefig("results/plots/waiting_time.png")
-        plt.grid()
-        plt.show()
-
-        # Plot rewards
-        plt.figure(figsize=(12, 6))
-        plt.plot(self.rewards, label="Reward", color='green')
-        plt.xlabel("Time Step")
-        plt.ylabel("Reward")
-        plt.title("Reward Progression")
-        plt.legend()
-        plt.savefig("results/plots/rewards.png")
-        plt.grid()
-        plt.show()
-
-        # Define the action durations (this can be placed in your class if it's not already there)
-        action_durations = [
-        {"green_duration": 5, "red_duration": 25},
-        {"green_duration": 10, "red_duration": 20},
-        {"green_duration": 15, "red_duration": 15},
-        {"green_duration": 20, "red_duration": 10},
-        {"green_duration": 25, "red_duration": 5},
-        ]
-
-        # Calculate frequency of each action
-        action_counts = {i: self.actions.count(i) for i in range(len(action_durations))}
-
-        # X-axis labels with action descriptions
-        x_labels = [
-            f"{i}: {action}" for i, action in enumerate(action_durations)
-        ]
-
-        # Plot action distribution
-        plt.figure(figsize=(12, 6))
-        plt.bar(action_counts.keys(), action_counts.values(), color='orange', alpha=0.7)
-        plt.xticks(ticks=range(len(x_labels)), labels=x_labels, rotation=45, ha='right')
-        plt.xlabel("Action (with Durations)")
-        plt.ylabel("Frequency")
-        plt.title("Action Distribution")
-        plt.tight_layout()
-        plt.savefig("results/plots/actions.png")
-        plt.grid()
-        plt.show()
-
-        time_steps = range(len(self.traffic_variation))  # Ensure traffic_variation is updated each step
-        total_vehicle_counts = [
-            entry.get("High Traffic", 0) + entry.get("Low Traffic", 0) for entry in self.traffic_variation
-        ]
-
-        plt.figure(figsize=(12, 6))
-        plt.plot(time_steps, total_vehicle_counts, label="Total Vehicles Passed", color='green')
-        plt.xlabel("Time Step")
-        plt.ylabel("Number of Vehicles")
-        plt.title("Total Number of Vehicles Passed Over Time")
-        plt.legend()
-        plt.grid()
-        plt.savefig("results/plots/vehicles_passed.png")
-        plt.show()
-
-        action_colors = ['blue', 'orange', 'green', 'red', 'purple']  # One color for each action (0, 1, 2, 3, 4)
-
-        time_steps = range(len(self.actions_taken))  # Time steps correspond to the length of actions_taken
-
-        plt.figure(figsize=(12, 6))
-
-        # Use a bar plot with categorical y-axis
-        plt.bar(
-            time_steps,
-            self.actions_taken,
-            color=[action_colors[int(action)] for action in self.actions_taken],  # Ensure actions map to indices correctly
-            alpha=0.8,
-            edgecolor="black"
-        )
-
-        plt.xlabel("Time Step")
-        plt.ylabel("Action")
-        plt.title("Actions Taken Over Time")
-
-        # Treat actions as categorical values on the y-axis
-        plt.yticks(ticks=[0, 1, 2, 3, 4], labels=['Action 0', 'Action 1', 'Action 2', 'Action 3', 'Action 4'])
-
-        plt.grid(axis='y', linestyle='--', alpha=0.7)
-
-
-        legend_patches = [Patch(color=color, label=f"Action {i}") for i, color in enumerate(action_colors)]
-        plt.legend(handles=legend_patches, title="Actions")
-        # Save and show the plot
-        plt.savefig("results/plots/actions_taken_bar.png")
-        plt.show()
+        from plot_metrics import plot_run
+
+        self.metrics.flush()
+        if not plot_run(self.metrics_dir, output_dir):
+            logger.warning("Metrics data is empty, check data collection in the simulation.")
+
+    def close(self):
+        """Flush the metrics log and transition recorder and close the simulation."""
+        if self.metrics is not None:
+            self.metrics.flush()
+        if self.recorder is not None:
+            self.recorder.flush()
+        super().close()
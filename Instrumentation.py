@@ -0,0 +1,193 @@
+import json
+import threading
+import time
+from collections import deque
+from contextlib import nullcontext
+
+# Counters whose rolling rates are reported by Profiler.snapshot()
+RATE_COUNTERS = {
+    "env_steps": "env_steps_per_s",
+    "updates": "updates_per_s",
+    "sim_seconds": "sim_seconds_per_wall_second",
+}
+
+
+class _Phase:
+    """Context manager adding the elapsed wall time of a block to one profiler timer."""
+
+    __slots__ = ("profiler", "name", "start")
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.start
+        calls, total = self.profiler.timers.get(self.name, (0, 0.0))
+        self.profiler.timers[self.name] = (calls + 1, total + elapsed)
+        return False
+
+
+class Profiler:
+    """
+    Per-phase wall-time timers, event counters and rolling throughput for the training loop.
+
+    Environments and agents call `phase(name)` around hot-path blocks and `count(name, n)` for
+    events (env steps, updates, simulated seconds, TraCI calls). A disabled profiler returns a
+    shared no-op context and ignores counts, so instrumentation left in place costs one method
+    call per site. Snapshots can be appended to a JSON-lines log or served as Prometheus text.
+    """
+
+    def __init__(self, enabled=True, rate_window=30.0):
+        """
+        :param enabled: Record anything at all.
+        :param rate_window: Seconds of history used for the rolling throughput rates.
+        """
+        self.enabled = enabled
+        self.rate_window = rate_window
+        self.timers = {}  # name -> (calls, total seconds)
+        self.counters = {}  # name -> count
+        self._history = deque()  # (time, counters copy) taken at each snapshot
+        self._noop = nullcontext()
+        self._server = None
+
+    def phase(self, name):
+        if not self.enabled:
+            return self._noop
+        return _Phase(self, name)
+
+    def count(self, name, n=1):
+        if self.enabled:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def rates(self):
+        """Rolling rates of RATE_COUNTERS over the last rate_window seconds."""
+        now = time.perf_counter()
+        counters = dict(self.counters)
+        self._history.append((now, counters))
+        while len(self._history) > 2 and now - self._history[1][0] >= self.rate_window:
+            self._history.popleft()
+        then, old = self._history[0]
+        elapsed = now - then
+        return {
+            rate: (counters.get(counter, 0) - old.get(counter, 0)) / elapsed if elapsed > 0 else 0.0
+            for counter, rate in RATE_COUNTERS.items()
+        }
+
+    def snapshot(self):
+        """:return: JSON-serialisable dict of timers, counters and rolling rates."""
+        return {
+            "time": time.time(),
+            "timers": {name: {"calls": calls, "total_s": total, "mean_ms": 1000.0 * total / calls}
+                       for name, (calls, total) in dict(self.timers).items()},
+            "counters": dict(self.counters),
+            "rates": self.rates(),
+        }
+
+    def write_jsonl(self, path):
+        """Append the current snapshot as one line of a structured JSON-lines log."""
+        if not self.enabled:
+            return
+        with open(path, "a") as f:
+            f.write(json.dumps(self.snapshot()) + "\n")
+
+    def prometheus_text(self, prefix="ramp_metering"):
+        """Render the current snapshot in the Prometheus text exposition format."""
+        snapshot = self.snapshot()
+        lines = [f"# TYPE {prefix}_phase_seconds_total counter"]
+        lines += [f'{prefix}_phase_seconds_total{{phase="{name}"}} {t["total_s"]}' for name, t in snapshot["timers"].items()]
+        lines.append(f"# TYPE {prefix}_phase_calls_total counter")
+        lines += [f'{prefix}_phase_calls_total{{phase="{name}"}} {t["calls"]}' for name, t in snapshot["timers"].items()]
+        lines.append(f"# TYPE {prefix}_events_total counter")
+        lines += [f'{prefix}_events_total{{name="{name}"}} {value}' for name, value in snapshot["counters"].items()]
+        lines.append(f"# TYPE {prefix}_rate gauge")
+        lines += [f'{prefix}_rate{{name="{name}"}} {value}' for name, value in snapshot["rates"].items()]
+        return "\n".join(lines) + "\n"
+
+    def serve_prometheus(self, port=9100, host="127.0.0.1"):
+        """Serve prometheus_text() at http://host:port/metrics from a daemon thread."""
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer  # Imported on use: slow and rarely needed
+
+        profiler = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = profiler.prometheus_text().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self._server
+
+    def close(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server = None
+
+
+NULL_PROFILER = Profiler(enabled=False)
+
+
+class _CountingDomain:
+    """Wrap one TraCI domain (lane, edge, vehicle, ...) so every method call is counted and timed."""
+
+    def __init__(self, domain, name, profiler):
+        self._domain = domain
+        self._name = name
+        self._profiler = profiler
+
+    def __getattr__(self, attr):
+        target = getattr(self._domain, attr)
+        if not callable(target):
+            return target
+        key = f"traci.{self._name}.{attr}"
+        profiler = self._profiler
+
+        def counted(*args, **kwargs):
+            profiler.count("traci_calls")
+            with profiler.phase(key):
+                return target(*args, **kwargs)
+
+        return counted
+
+
+class CountingTraci:
+    """
+    Proxy around the traci or libsumo module that counts and times every API call.
+
+    Only installed when profiling is enabled; exception classes and constants pass through.
+    """
+
+    DOMAINS = ("simulation", "lane", "edge", "vehicle", "trafficlight", "lanearea", "inductionloop", "route")
+
+    def __init__(self, module, profiler):
+        self._module = module
+        self._profiler = profiler
+        for name in self.DOMAINS:
+            if hasattr(module, name):
+                setattr(self, name, _CountingDomain(getattr(module, name), name, profiler))
+
+    def __getattr__(self, attr):
+        target = getattr(self._module, attr)
+        if not callable(target) or isinstance(target, type):
+            return target
+        key = f"traci.{attr}"
+        profiler = self._profiler
+
+        def counted(*args, **kwargs):
+            profiler.count("traci_calls")
+            with profiler.phase(key):
+                return target(*args, **kwargs)
+
+        return counted
@@ -0,0 +1,62 @@
+"""
+Dependency-free runtime for distilled ramp-metering policies (see export_policy.py).
+
+Only the standard library is imported, so loading a controller takes milliseconds and needs
+neither NumPy nor TensorFlow. The policy file is memory mapped; answering a query is a few float
+operations and one byte read.
+
+File layout (little-endian):
+    magic b"RMLP", uint32 version, uint32 number of dimensions D,
+    D x (uint32 bins, uint32 scale, float64 low, float64 high),
+    prod(bins) uint8 actions in C order.
+scale 0 maps a feature linearly onto [low, high], scale 1 maps log1p(feature); values outside the
+range fall into the first or last bin.
+"""
+import math
+import mmap
+import struct
+
+MAGIC = b"RMLP"
+VERSION = 1
+LINEAR, LOG1P = 0, 1
+HEADER = struct.Struct("<4sII")
+AXIS = struct.Struct("<IIdd")
+
+
+class LookupPolicy:
+    """Quantized state grid -> action table, answering act(density, waiting_time, queue_length)."""
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, dims = HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} lookup policy")
+        self.axes = [AXIS.unpack_from(self._mmap, HEADER.size + i * AXIS.size) for i in range(dims)]
+        self._offset = HEADER.size + dims * AXIS.size
+        # Row-major strides of the action table
+        self._strides = []
+        stride = 1
+        for bins, _, _, _ in reversed(self.axes):
+            self._strides.insert(0, stride)
+            stride *= bins
+        self.size = stride
+
+    def act(self, *state):
+        """
+        :param state: One value per dimension, e.g. act(density, waiting_time, queue_length),
+            or a single sequence such as a state row.
+        :return: Action index.
+        """
+        if len(state) == 1 and hasattr(state[0], "__len__"):
+            state = state[0]
+        index = self._offset
+        for value, (bins, scale, low, high), stride in zip(state, self.axes, self._strides):
+            if scale == LOG1P:
+                value = math.log1p(max(value, 0.0))
+            position = int((value - low) / (high - low) * bins) if high > low else 0
+            index += stride * min(max(position, 0), bins - 1)
+        return self._mmap[index]
+
+    def close(self):
+        self._mmap.close()
@@ -0,0 +1,158 @@
+import json
+import os
+
+import numpy as np
+
+# Per-step columns written by DynamicFlowSumoEnvironment and their on-disk dtypes
+STEP_COLUMNS = {
+    "episode": "int32",
+    "step": "int32",
+    "action": "int8",
+    "reward": "float32",
+    "traffic_density": "float32",
+    "waiting_time": "float32",
+    "queue_length": "float32",
+    "high_traffic": "uint8",
+    "vehicles_added": "int16",
+}
+
+
+class MetricsWriter:
+    """
+    Append-only columnar log of per-step metrics.
+
+    Each column is a raw little-endian binary file (<column>.bin) next to a schema.json naming the
+    dtypes, so a column can be memory mapped as one flat array without parsing anything. Rows are
+    collected in fixed-size NumPy buffers and appended to the column files one chunk at a time, so
+    memory use stays bounded however long training runs.
+    """
+
+    def __init__(self, directory, columns=None, chunk_rows=1024, metadata=None, append=False):
+        """
+        :param directory: Run directory.
+        :param columns: Mapping of column name to NumPy dtype, STEP_COLUMNS by default.
+        :param chunk_rows: Rows buffered in memory before they are written out.
+        :param metadata: Extra JSON-serialisable information stored in schema.json (e.g. action labels).
+        :param append: Continue an existing log with the same schema instead of starting a new one.
+        """
+        self.directory = directory
+        self.columns = {name: np.dtype(dtype).newbyteorder("<") for name, dtype in (columns or STEP_COLUMNS).items()}
+        self.chunk_rows = chunk_rows
+        self._buffers = {name: np.zeros(chunk_rows, dtype=dtype) for name, dtype in self.columns.items()}
+        self._size = 0
+
+        os.makedirs(directory, exist_ok=True)
+        schema_path = os.path.join(directory, "schema.json")
+        if not append:
+            for name in list(self.columns) + ["schema"]:
+                path = os.path.join(directory, f"{name}.json" if name == "schema" else f"{name}.bin")
+                if os.path.exists(path):
+                    os.remove(path)
+        if os.path.exists(schema_path):
+            with open(schema_path) as f:
+                schema = json.load(f)
+            if schema["columns"] != {name: dtype.str for name, dtype in self.columns.items()}:
+                raise ValueError(f"Metrics log in {directory} has a different schema")
+        else:
+            with open(schema_path, "w") as f:
+                json.dump({"columns": {name: dtype.str for name, dtype in self.columns.items()},
+                           "metadata": metadata or {}}, f, indent=2)
+
+    def append(self, **row):
+        """Buffer one row; every column must be given."""
+        i = self._size
+        for name, buffer in self._buffers.items():
+            buffer[i] = row[name]
+        self._size += 1
+        if self._size == self.chunk_rows:
+            self.flush()
+
+    def flush(self):
+        """Append the buffered rows to the column files."""
+        if self._size == 0:
+            return
+        for name, buffer in self._buffers.items():
+            with open(os.path.join(self.directory, f"{name}.bin"), "ab") as f:
+                f.write(buffer[:self._size].tobytes())
+        self._size = 0
+
+    def close(self):
+        self.flush()
+
+
+class MetricsReader:
+    """Read-only, memory-mapped view of one run directory written by MetricsWriter."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        with open(os.path.join(directory, "schema.json")) as f:
+            schema = json.load(f)
+        self.columns = {name: np.dtype(dtype) for name, dtype in schema["columns"].items()}
+        self.metadata = schema.get("metadata", {})
+        # Rows present in every column; a run killed mid-flush may leave some columns one chunk ahead
+        self.rows = min((self._file_rows(name) for name in self.columns), default=0)
+
+    def _file_rows(self, name):
+        path = os.path.join(self.directory, f"{name}.bin")
+        return os.path.getsize(path) // self.columns[name].itemsize if os.path.exists(path) else 0
+
+    def __len__(self):
+        return self.rows
+
+    def column(self, name):
+        """:return: The whole column as a read-only memory map (an empty array for an empty log)."""
+        if self.rows == 0:
+            return np.zeros(0, dtype=self.columns[name])
+        return np.memmap(os.path.join(self.directory, f"{name}.bin"), dtype=self.columns[name], mode="r",
+                         shape=(self.rows,))
+
+    def iter_chunks(self, names, chunk_rows=1 << 16):
+        """Yield dicts of column slices of at most chunk_rows rows, touching one chunk of the files at a time."""
+        columns = {name: self.column(name) for name in names}
+        for start in range(0, self.rows, chunk_rows):
+            yield {name: np.asarray(values[start:start + chunk_rows]) for name, values in columns.items()}
+
+    def per_episode(self, name, reducer="sum", chunk_rows=1 << 16):
+        """
+        Reduce a column per episode in a single streaming pass.
+        :param reducer: "sum" or "mean".
+        :return: (episode indices, values) for the episodes present in the log.
+        """
+        totals = np.zeros(0)
+        counts = np.zeros(0)
+        for chunk in self.iter_chunks(("episode", name), chunk_rows):
+            size = int(chunk["episode"].max()) + 1
+            if size > len(totals):
+                totals = np.pad(totals, (0, size - len(totals)))
+                counts = np.pad(counts, (0, size - len(counts)))
+            totals[:size] += np.bincount(chunk["episode"], weights=chunk[name], minlength=size)
+            counts[:size] += np.bincount(chunk["episode"], minlength=size)
+        episodes = np.flatnonzero(counts)
+        if reducer == "mean":
+            return episodes, totals[episodes] / counts[episodes]
+        return episodes, totals[episodes]
+
+    def value_counts(self, name, minlength=0, chunk_rows=1 << 16):
+        """:return: np.bincount of an integer column, computed chunk by chunk."""
+        counts = np.zeros(minlength, dtype=np.int64)
+        for chunk in self.iter_chunks((name,), chunk_rows):
+            chunk_counts = np.bincount(chunk[name], minlength=len(counts))
+            if len(chunk_counts) > len(counts):
+                counts = np.pad(counts, (0, len(chunk_counts) - len(counts)))
+            counts += chunk_counts
+        return counts
+
+    def downsample(self, name, max_points=5000):
+        """:return: (row indices, per-bucket means) with at most max_points buckets, for plotting long runs."""
+        if self.rows <= max_points:
+            return np.arange(self.rows), np.asarray(self.column(name), dtype=np.float64)
+        sums = np.zeros(max_points)
+        counts = np.zeros(max_points)
+        start = 0
+        for chunk in self.iter_chunks((name,)):
+            rows = np.arange(start, start + len(chunk[name]))
+            buckets = rows * max_points // self.rows
+            sums += np.bincount(buckets, weights=chunk[name], minlength=max_points)
+            counts += np.bincount(buckets, minlength=max_points)
+            start += len(rows)
+        return np.arange(max_points) * self.rows // max_points, sums / counts
@@ -0,0 +1,184 @@
+import json
+
+import numpy as np
+from NetworkTopology import NetworkTopology
+from SumoEnvironment import (ACTIONS, LAST_STEP_VEHICLE_NUMBER, REWARD_WEIGHTS, VAR_INTERVAL_NUMBER,
+                             VAR_INTERVAL_TIMELOSS, VAR_WAITING_TIME, Observation, Ramp, SumoEnvironment,
+                             WindowMetrics)
+
+GREEN_DURATIONS = np.array([action["green_duration"] for action in ACTIONS])
+RED_DURATIONS = np.array([action["red_duration"] for action in ACTIONS])
+
+
+def load_ramps(path):
+    """Read a JSON list of ramp definitions (see ramps.json) into Ramp tuples."""
+    with open(path) as f:
+        return [Ramp(**ramp) for ramp in json.load(f)]
+
+
+def _incidence(groups, order):
+    """(len(groups), len(order)) matrix with a 1 where an object of `order` belongs to a group."""
+    index = {name: i for i, name in enumerate(order)}
+    matrix = np.zeros((len(groups), len(order)))
+    for k, group in enumerate(groups):
+        for name in group:
+            matrix[k, index[name]] += 1
+    return matrix
+
+
+class MultiRampSumoEnvironment(SumoEnvironment):
+    """
+    K metered ramps in one simulation, each with its own signal and monitored lane/edge/detector groups.
+
+    States, actions and rewards are arrays with one row per ramp, so a single shared DQNAgent picks
+    all K plans with one act_batch forward pass; a one-hot ramp ID appended to each state lets the
+    shared network tell the ramps apart. Every monitored object is subscribed once, however many
+    ramps use it, and the per-ramp features and rewards are computed from the subscription results
+    with index arrays and incidence matrices, so reads stay at one round-trip per domain per step.
+    """
+
+    def __init__(self, sumo_cfg_file, ramps=None, ramp_id_feature=True, **kwargs):
+        """
+        :param ramps: Ramp tuples, dicts with the Ramp fields or traffic light IDs whose ramps are derived
+            from the network topology; or the path of a JSON file of Ramp dicts. None meters every
+            traffic light in the network.
+        :param ramp_id_feature: Append a one-hot ramp ID to each ramp's state.
+        :param kwargs: Forwarded to SumoEnvironment (backend, warmup_steps, ...).
+        """
+        topology = NetworkTopology.load(sumo_cfg_file)
+        if ramps is None:
+            ramps = [str(tls_id) for tls_id in topology.tls_ids]
+        elif isinstance(ramps, str):
+            ramps = load_ramps(ramps)
+        self.ramps = []
+        for ramp in ramps:
+            if isinstance(ramp, str):
+                ramp = topology.ramp(ramp)
+            elif not isinstance(ramp, Ramp):
+                ramp = Ramp(**ramp)
+            self.ramps.append(ramp)
+        super().__init__(sumo_cfg_file, self.ramps[0].traffic_light_id, **kwargs)
+        self.num_ramps = len(self.ramps)
+        self.ramp_id_feature = ramp_id_feature
+        self.state_size = 3 + (self.num_ramps if ramp_id_feature else 0)
+
+        # Fixed order of every monitored object, shared by all ramps
+        self.lane_order = sorted({lane for ramp in self.ramps
+                                  for lane in list(ramp.reward_lanes) + [ramp.density_lane, ramp.queue_lane]})
+        self.edge_order = sorted({edge for ramp in self.ramps for edge in list(ramp.reward_edges) + [ramp.waiting_edge]})
+        self.detector_order = sorted({detector for ramp in self.ramps
+                                      for detector in list(ramp.delay_detectors) + list(ramp.exit_detectors)})
+
+        # Per-ramp positions of the state features and incidence matrices of the reward groups
+        self.density_index = np.array([self.lane_order.index(ramp.density_lane) for ramp in self.ramps])
+        self.queue_index = np.array([self.lane_order.index(ramp.queue_lane) for ramp in self.ramps])
+        self.waiting_index = np.array([self.edge_order.index(ramp.waiting_edge) for ramp in self.ramps])
+        self.reward_lane_matrix = _incidence([ramp.reward_lanes for ramp in self.ramps], self.lane_order)
+        self.reward_edge_matrix = _incidence([ramp.reward_edges for ramp in self.ramps], self.edge_order)
+        self.delay_matrix = _incidence([ramp.delay_detectors for ramp in self.ramps], self.detector_order)
+        self.exit_matrix = _incidence([ramp.exit_detectors for ramp in self.ramps], self.detector_order)
+        self.reward_edge_counts = self.reward_edge_matrix.sum(axis=1)
+        self.ramp_ids = np.eye(self.num_ramps)
+        lengths = self.topology.lane_length_of({ramp.density_lane for ramp in self.ramps})
+        self.density_lengths = np.array([lengths[ramp.density_lane] for ramp in self.ramps])
+
+    def _subscribe(self):
+        """Register one subscription per monitored object."""
+        for lane in self.lane_order:
+            self.traci.lane.subscribe(lane, [LAST_STEP_VEHICLE_NUMBER])
+        for edge in self.edge_order:
+            self.traci.edge.subscribe(edge, [LAST_STEP_VEHICLE_NUMBER, VAR_WAITING_TIME])
+        for detector in self.detector_order:
+            self.traci.lanearea.subscribe(detector, [VAR_INTERVAL_NUMBER, VAR_INTERVAL_TIMELOSS])
+        self.sim_time = self.traci.simulation.getTime()
+        self.window = None
+        self._observation = None
+
+    def observe(self):
+        """Return the Observation for the current simulation step, with arrays in lane/edge/detector order."""
+        if self._observation is None:
+            lanes = self.traci.lane.getAllSubscriptionResults()
+            edges = self.traci.edge.getAllSubscriptionResults()
+            detectors = self.traci.lanearea.getAllSubscriptionResults()
+            detector_vehicles = np.array([detectors[d][VAR_INTERVAL_NUMBER] for d in self.detector_order], dtype=float)
+            self._observation = Observation(
+                lane_vehicles=np.array([lanes[lane][LAST_STEP_VEHICLE_NUMBER] for lane in self.lane_order], dtype=float),
+                edge_vehicles=np.array([edges[edge][LAST_STEP_VEHICLE_NUMBER] for edge in self.edge_order], dtype=float),
+                edge_waiting_time=np.array([edges[edge][VAR_WAITING_TIME] for edge in self.edge_order], dtype=float),
+                detector_vehicles=detector_vehicles,
+                detector_time_loss=detector_vehicles * np.array(
+                    [detectors[d][VAR_INTERVAL_TIMELOSS] for d in self.detector_order], dtype=float),
+            )
+        return self._observation
+
+    def queue_length(self, observation):
+        """Number of vehicles on each ramp's queue-monitored lanes."""
+        return self.reward_lane_matrix @ observation.lane_vehicles
+
+    def macro_step(self, duration):
+        """
+        Advance all ramps through one shared window of `duration` seconds.
+        :return: WindowMetrics whose fields are arrays with one value per ramp.
+        """
+        start = self.observe()
+        max_queue = self.queue_length(start)
+        begin = self.sim_time
+        with self.profiler.phase("env.simulation_step"):
+            for k in range(1, self.macro_step_samples + 1):
+                self.sim_time = begin + duration * k / self.macro_step_samples
+                self._simulation_step(self.sim_time)
+                max_queue = np.maximum(max_queue, self.queue_length(self.observe()))
+        self.profiler.count("sim_seconds", duration)
+        end = self.observe()
+        self.window = WindowMetrics(
+            duration=duration,
+            vehicles_passed=self.exit_matrix @ (end.detector_vehicles - start.detector_vehicles),
+            delay=self.delay_matrix @ (end.detector_time_loss - start.detector_time_loss),
+            max_queue=max_queue,
+        )
+        return self.window
+
+    def get_state(self):
+        """
+        :return: (num_ramps, state_size) array of traffic density, waiting time and queue length per ramp,
+            followed by the one-hot ramp ID when ramp_id_feature is set.
+        """
+        observation = self.observe()
+        state = np.column_stack([
+            observation.lane_vehicles[self.density_index] / self.density_lengths,
+            observation.edge_waiting_time[self.waiting_index],
+            observation.lane_vehicles[self.queue_index],
+        ])
+        if self.ramp_id_feature:
+            state = np.hstack([state, self.ramp_ids])
+        return state
+
+    def get_reward(self):
+        """
+        Per-ramp reward, the same weighted flow, waiting time and queue terms as SumoEnvironment.get_reward.
+        :return: Array of num_ramps rewards.
+        """
+        observation = self.observe()
+        if self.window is not None:
+            duration = self.window.duration
+            flow, waiting_time = self.window.vehicles_passed / duration, self.window.delay / duration
+            queue = self.window.max_queue
+        else:
+            flow = self.reward_edge_matrix @ observation.edge_vehicles
+            waiting_time = self.reward_edge_matrix @ observation.edge_waiting_time
+            queue = self.reward_lane_matrix @ observation.lane_vehicles
+        reward = (REWARD_WEIGHTS["flow_rate"] * flow + REWARD_WEIGHTS["waiting_time"] * waiting_time +
+                  REWARD_WEIGHTS["queue_length"] * queue)
+        return reward / self.reward_edge_counts
+
+    def take_action(self, actions):
+        """
+        Set every ramp's green duration and advance through the longest of the selected red windows,
+        so all ramps decide again at the same simulation time.
+        :param actions: One action index per ramp (a scalar applies to all ramps).
+        """
+        actions = np.broadcast_to(np.asarray(actions, dtype=int), (self.num_ramps,))
+        # TraCI has no multi-signal setter; the writes are one cheap call per ramp without a reply payload
+        for ramp, green in zip(self.ramps, GREEN_DURATIONS[actions].tolist()):
+            self.traci.trafficlight.setPhaseDuration(ramp.traffic_light_id, green)
+        return self.macro_step(int(RED_DURATIONS[actions].max()))
@@ -0,0 +1,202 @@
+import hashlib
+import logging
+import os
+import xml.etree.ElementTree as ET
+from collections import namedtuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Signal and monitored lane/edge/detector groups of one metered ramp
+Ramp = namedtuple("Ramp", ["traffic_light_id", "density_lane", "queue_lane", "waiting_edge", "reward_edges",
+                           "reward_lanes", "delay_detectors", "exit_detectors"])
+
+# Arrays stored in the cache file; names become the *_index maps on load
+ID_ARRAYS = ("junction_ids", "edge_ids", "lane_ids", "tls_ids", "detector_ids")
+
+
+def network_files(sumo_cfg_file):
+    """
+    Read the .sumocfg input section.
+    :return: (net file, list of additional files), as paths relative to the working directory.
+    """
+    base = os.path.dirname(os.path.abspath(sumo_cfg_file))
+    inputs = ET.parse(sumo_cfg_file).getroot().find("input")
+    net_file = os.path.join(base, inputs.find("net-file").get("value"))
+    additional = inputs.find("additional-files")
+    additional_files = []
+    if additional is not None:
+        additional_files = [os.path.join(base, name) for name in additional.get("value").replace(",", " ").split()]
+    return net_file, additional_files
+
+
+class NetworkTopology:
+    """
+    Static description of a SUMO network as flat arrays plus name -> index maps.
+
+    Built once from the .net.xml referenced by a .sumocfg (and the lane-area detectors of its
+    additional files) and cached as an .npz file keyed by the SHA-1 of those files, so later runs
+    load it without parsing XML and the environments never fetch static data over TraCI.
+    Internal (junction) edges and lanes are left out.
+    """
+
+    def __init__(self, arrays):
+        """:param arrays: Dict of the arrays produced by parse(), as saved in the cache file."""
+        for name, values in arrays.items():
+            setattr(self, name, values)
+        for name in ID_ARRAYS:
+            setattr(self, name.replace("_ids", "_index"), {str(v): i for i, v in enumerate(getattr(self, name))})
+
+    @classmethod
+    def load(cls, sumo_cfg_file, cache_dir=None):
+        """
+        Return the topology of the network used by a .sumocfg, from the cache when the files are unchanged.
+        :param cache_dir: Directory of the cache files, .topology_cache next to the .sumocfg by default.
+        """
+        net_file, additional_files = network_files(sumo_cfg_file)
+        digest = hashlib.sha1()
+        for path in [net_file] + additional_files:
+            with open(path, "rb") as f:
+                digest.update(f.read())
+        cache_dir = cache_dir or os.path.join(os.path.dirname(os.path.abspath(sumo_cfg_file)), ".topology_cache")
+        cache_file = os.path.join(cache_dir, f"{digest.hexdigest()}.npz")
+        if os.path.exists(cache_file):
+            with np.load(cache_file) as data:
+                return cls(dict(data))
+
+        arrays = cls.parse(net_file, additional_files)
+        os.makedirs(cache_dir, exist_ok=True)
+        # Write under a temporary name first so parallel workers never read a partial file
+        partial = f"{cache_file}.{os.getpid()}.tmp.npz"
+        np.savez(partial, **arrays)
+        os.replace(partial, cache_file)
+        return cls(arrays)
+
+    @staticmethod
+    def parse(net_file, additional_files=()):
+        """Parse the network and detector files into the dict of arrays stored in the cache."""
+        junctions, edges, lanes, connections, tls, detectors = [], [], [], [], [], []
+        for _, element in ET.iterparse(net_file):
+            if element.tag == "junction" and element.get("type") != "internal":
+                junctions.append((element.get("id"), element.get("type")))
+            elif element.tag == "edge" and element.get("function") != "internal":
+                edges.append((element.get("id"), element.get("from"), element.get("to")))
+                lanes += [(lane.get("id"), element.get("id"), int(lane.get("index")), float(lane.get("length")),
+                           float(lane.get("speed"))) for lane in element.iter("lane")]
+            elif element.tag == "connection" and not element.get("from").startswith(":"):
+                connections.append((element.get("from"), int(element.get("fromLane")), element.get("to"),
+                                    int(element.get("toLane")), element.get("tl", "")))
+            elif element.tag == "tlLogic" and element.get("id") not in tls:
+                tls.append(element.get("id"))
+            if element.tag in ("junction", "edge", "tlLogic"):
+                element.clear()
+        for path in additional_files:
+            for _, element in ET.iterparse(path):
+                if element.tag in ("laneAreaDetector", "e2Detector") and element.get("lane"):
+                    detectors.append((element.get("id"), element.get("lane")))
+
+        junction_index = {junction[0]: i for i, junction in enumerate(junctions)}
+        edge_index = {edge[0]: i for i, edge in enumerate(edges)}
+        lane_index = {lane[0]: i for i, lane in enumerate(lanes)}
+        tls_index = {tls_id: i for i, tls_id in enumerate(tls)}
+        lane_of = {(lane[1], lane[2]): i for i, lane in enumerate(lanes)}
+        return {
+            "junction_ids": np.array([j[0] for j in junctions], dtype=str),
+            "junction_type": np.array([j[1] for j in junctions], dtype=str),
+            "edge_ids": np.array([e[0] for e in edges], dtype=str),
+            "edge_from": np.array([junction_index.get(e[1], -1) for e in edges], dtype=np.int32),
+            "edge_to": np.array([junction_index.get(e[2], -1) for e in edges], dtype=np.int32),
+            "lane_ids": np.array([lane[0] for lane in lanes], dtype=str),
+            "lane_edge": np.array([edge_index[lane[1]] for lane in lanes], dtype=np.int32),
+            "lane_position": np.array([lane[2] for lane in lanes], dtype=np.int32),
+            "lane_length": np.array([lane[3] for lane in lanes]),
+            "lane_speed": np.array([lane[4] for lane in lanes]),
+            "connection_from": np.array([lane_of[(c[0], c[1])] for c in connections], dtype=np.int32),
+            "connection_to": np.array([lane_of[(c[2], c[3])] for c in connections], dtype=np.int32),
+            "connection_tls": np.array([tls_index.get(c[4], -1) for c in connections], dtype=np.int32),
+            "tls_ids": np.array(tls, dtype=str),
+            "detector_ids": np.array([d[0] for d in detectors], dtype=str),
+            "detector_lane": np.array([lane_index.get(d[1], -1) for d in detectors], dtype=np.int32),
+        }
+
+    def edge_lanes(self, edge):
+        """Lane indices of an edge index, rightmost first."""
+        lanes = np.flatnonzero(self.lane_edge == edge)
+        return lanes[np.argsort(self.lane_position[lanes])]
+
+    def incoming_edges(self, junction):
+        return np.flatnonzero(self.edge_to == junction)
+
+    def outgoing_edges(self, junction):
+        return np.flatnonzero(self.edge_from == junction)
+
+    def controlled_lanes(self, tls_id):
+        """(incoming lane indices, outgoing lane indices) of the connections a traffic light controls."""
+        connections = np.flatnonzero(self.connection_tls == self.tls_index[tls_id])
+        return np.unique(self.connection_from[connections]), np.unique(self.connection_to[connections])
+
+    def lane_length_of(self, lane_ids):
+        """Dict of lane ID -> length."""
+        return {lane: float(self.lane_length[self.lane_index[lane]]) for lane in lane_ids}
+
+    def ramp(self, tls_id):
+        """
+        Derive the monitored sets of the ramp metered by a traffic light.
+
+        The signal's incoming edge is the ramp approach (waiting time) and its outgoing lane the
+        queue lane. The ramp ends at a merge junction; the density lane is the mainline lane next
+        to the one the ramp feeds on the merge's outgoing edge. Rewards cover the approach, the
+        ramp, every edge entering and leaving the merge and the edges right after those.
+
+        Queue lengths are read on the rightmost lane of each reward edge when that lane is an
+        incoming lane of the edge's downstream junction (it has a connection through it, or the
+        junction ends the network); a rightmost lane that ends inside the junction, like the
+        acceleration lane the ramp feeds, holds merging rather than queued vehicles. Delay is read
+        from the lane-area detectors on those lanes (lanes without one are logged and left out of
+        the delay), throughput from the detectors on reward edges that leave the network.
+        """
+        approach_lanes, ramp_lanes = self.controlled_lanes(tls_id)
+        approach_edge = self.lane_edge[approach_lanes[0]]
+        ramp_lane = ramp_lanes[0]
+        ramp_edge = self.lane_edge[ramp_lane]
+        merge = self.edge_to[ramp_edge]
+
+        merge_lanes = self.connection_to[self.connection_from == ramp_lane]
+        density_lane = ramp_lane
+        if len(merge_lanes):
+            downstream = self.edge_lanes(self.lane_edge[merge_lanes[0]])
+            beside = downstream[self.lane_position[downstream] == self.lane_position[merge_lanes[0]] + 1]
+            density_lane = beside[0] if len(beside) else merge_lanes[0]
+
+        merge_out = self.outgoing_edges(merge)
+        after_merge = [e for edge in merge_out for e in self.outgoing_edges(self.edge_to[edge])]
+        reward_edges = np.unique(np.concatenate([[approach_edge, ramp_edge], self.incoming_edges(merge), merge_out,
+                                                 np.array(after_merge, dtype=np.int64)]).astype(np.int64))
+
+        connected_lanes = set(self.connection_from.tolist())
+        reward_lanes, delay_detectors, exit_detectors = [], [], []
+        for edge in reward_edges:
+            lanes = self.edge_lanes(edge)
+            leaves_network = self.junction_type[self.edge_to[edge]] == "dead_end"
+            if lanes[0] in connected_lanes or leaves_network:
+                reward_lanes.append(str(self.lane_ids[lanes[0]]))
+                detectors = np.flatnonzero(self.detector_lane == lanes[0])
+                if len(detectors):
+                    delay_detectors.append(str(self.detector_ids[detectors[0]]))
+                else:
+                    logger.warning("Reward lane %s of traffic light %s has no lane-area detector; its delay is not "
+                                   "measured", self.lane_ids[lanes[0]], tls_id)
+            if leaves_network:
+                exit_detectors += [str(self.detector_ids[d]) for d in np.flatnonzero(np.isin(self.detector_lane, lanes))]
+
+        return Ramp(
+            traffic_light_id=tls_id,
+            density_lane=str(self.lane_ids[density_lane]),
+            queue_lane=str(self.lane_ids[ramp_lane]),
+            waiting_edge=str(self.edge_ids[approach_edge]),
+            reward_edges=[str(self.edge_ids[edge]) for edge in reward_edges],
+            reward_lanes=reward_lanes,
+            delay_detectors=delay_detectors,
+            exit_detectors=exit_detectors,
+        )
@@ -0,0 +1,57 @@
+import numpy as np
+
+class NumpyQNetwork:
+    """
+    Pure-NumPy forward pass of the DQNAgent Q-network (Dense ReLU layers, linear output).
+
+    A Keras predict call on one 3-feature row costs milliseconds of framework overhead for
+    about a thousand FLOPs; this mirrors the Keras weights and evaluates the same MLP with a
+    few matrix products. Call sync_from(model) after each training update to stay in step.
+    """
+
+    def __init__(self, weights=None):
+        self.layers = []  # (kernel, bias) pairs, last layer is linear
+        if weights is not None:
+            self.set_weights(weights)
+
+    def set_weights(self, weights):
+        """Load weights in Keras get_weights() order: [W1, b1, W2, b2, ...]."""
+        self.layers = [
+            (np.asarray(weights[i], dtype=np.float32), np.asarray(weights[i + 1], dtype=np.float32))
+            for i in range(0, len(weights), 2)
+        ]
+
+    @classmethod
+    def from_h5(cls, path):
+        """Load the weights of a Keras model saved as .h5 (e.g. results/dqn_model.h5) without importing TensorFlow."""
+        import h5py
+
+        def name(value):
+            return value.decode() if isinstance(value, bytes) else str(value)
+
+        weights = []
+        with h5py.File(path, "r") as f:
+            group = f["model_weights"] if "model_weights" in f else f
+            for layer in group.attrs["layer_names"]:
+                layer_group = group[name(layer)]
+                weights += [np.array(layer_group[name(weight)]) for weight in layer_group.attrs["weight_names"]]
+        return cls(weights)
+
+    def sync_from(self, model):
+        """Copy the current weights of a Keras model."""
+        self.set_weights(model.get_weights())
+
+    def predict_batch(self, states):
+        """
+        :param states: Array of shape (n, state_size).
+        :return: Q-values of shape (n, action_size).
+        """
+        x = np.asarray(states, dtype=np.float32)
+        for kernel, bias in self.layers[:-1]:
+            x = np.maximum(x @ kernel + bias, 0.0)
+        kernel, bias = self.layers[-1]
+        return x @ kernel + bias
+
+    def predict(self, state):
+        """Q-values for a single state given flat or shaped (1, state_size); returns shape (1, action_size)."""
+        return self.predict_batch(np.reshape(state, (1, -1)))
@@ -0,0 +1,108 @@
+import numpy as np
+from ReplayBuffer import ReplayBuffer
+
+class SumTree:
+    """
+    Binary sum-tree over a fixed number of leaves stored in a flat array.
+
+    Node i has children 2i and 2i + 1, the root is node 1 and leaf j lives at
+    node `offset + j`. Batched updates and prefix-sum lookups walk all paths one
+    tree level at a time, so both cost O(batch * log n) in vectorized NumPy.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = int(capacity)
+        self.offset = 1
+        while self.offset < self.capacity:
+            self.offset *= 2
+        self.depth = int(np.log2(self.offset))
+        self.nodes = np.zeros(2 * self.offset, dtype=np.float64)
+
+    def total(self):
+        return self.nodes[1]
+
+    def max_leaf(self):
+        return self.nodes[self.offset:self.offset + self.capacity].max()
+
+    def update(self, indices, values):
+        """Set the leaves at `indices` to `values` and refresh their ancestors."""
+        nodes = np.asarray(indices, dtype=np.int64) + self.offset
+        self.nodes[nodes] = values
+        for _ in range(self.depth):
+            nodes = np.unique(nodes // 2)
+            self.nodes[nodes] = self.nodes[2 * nodes] + self.nodes[2 * nodes + 1]
+
+    def find(self, values):
+        """Return the leaf index whose cumulative range contains each prefix-sum value."""
+        values = np.array(values, dtype=np.float64)
+        nodes = np.ones(len(values), dtype=np.int64)
+        for _ in range(self.depth):
+            left = 2 * nodes
+            left_sum = self.nodes[left]
+            go_right = values > left_sum
+            values = np.where(go_right, values - left_sum, values)
+            nodes = left + go_right
+        return np.minimum(nodes - self.offset, self.capacity - 1)
+
+
+class PrioritizedReplayBuffer(ReplayBuffer):
+    """
+    Proportional prioritized experience replay (Schaul et al., 2016).
+
+    Transitions are sampled with probability p_i^alpha / sum_k p_k^alpha and returned
+    together with importance-sampling weights (N * P(i))^-beta normalised by their maximum.
+    New transitions get the current maximum priority so they are replayed at least once.
+    """
+
+    def __init__(self, capacity, state_size, alpha=0.6, beta=0.4, beta_increment=0.001, epsilon=1e-6,
+                 filename=None, seed=None):
+        """
+        :param alpha: How strongly priorities skew sampling (0 is uniform).
+        :param beta: Initial importance-sampling exponent, annealed towards 1.
+        :param beta_increment: Amount added to beta after every sampled minibatch.
+        :param epsilon: Small constant added to |TD error| so no transition gets zero priority.
+        """
+        super().__init__(capacity, state_size, filename=filename, seed=seed)
+        self.alpha = alpha
+        self.beta = beta
+        self.beta_increment = beta_increment
+        self.epsilon = epsilon
+        self.tree = SumTree(self.capacity)
+        self.max_priority = 1.0
+        if self.size:
+            # Reopened memory-mapped buffer: priorities are not persisted, start uniform
+            self.tree.update(np.arange(self.size), self.max_priority)
+
+    def add(self, state, action, reward, next_state, done):
+        i = super().add(state, action, reward, next_state, done)
+        self.tree.update([i], self.max_priority)
+        return i
+
+    def add_batch(self, states, actions, rewards, next_states, dones):
+        indices = super().add_batch(states, actions, rewards, next_states, dones)
+        self.tree.update(indices, self.max_priority)
+        return indices
+
+    def sample_indices(self, batch_size):
+        """Stratified proportional sampling: one draw from each of batch_size equal slices of the total."""
+        segment = self.tree.total() / batch_size
+        values = (np.arange(batch_size) + self.rng.random(batch_size)) * segment
+        return np.minimum(self.tree.find(values), self.size - 1)
+
+    def sample(self, batch_size):
+        """
+        Sample a prioritized minibatch.
+        :return: (states, actions, rewards, next_states, dones, indices, weights)
+        """
+        indices = self.sample_indices(batch_size)
+        probabilities = self.tree.nodes[indices + self.tree.offset] / self.tree.total()
+        weights = (self.size * probabilities) ** -self.beta
+        weights = (weights / weights.max()).astype(np.float32)
+        self.beta = min(1.0, self.beta + self.beta_increment)
+        return self.gather(indices) + (indices, weights)
+
+    def update_priorities(self, indices, td_errors):
+        """Set the priorities of the sampled transitions from their new TD errors."""
+        priorities = (np.abs(td_errors) + self.epsilon) ** self.alpha
+        self.tree.update(indices, priorities)
+        self.max_priority = max(self.max_priority, float(priorities.max()))
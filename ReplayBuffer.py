@@ -0,0 +1,146 @@
+import json
+import os
+import numpy as np
+
+class ReplayBuffer:
+    """
+    Fixed-size experience replay memory backed by preallocated typed arrays.
+
+    Transitions are written at a cursor that wraps around once the buffer is full, so
+    storing a transition never allocates Python objects. When `filename` is given the
+    columns live in memory-mapped .npy files inside that directory, which lets large
+    buffers exceed RAM and be reopened by a later process. The cursor and size are kept in
+    meta.json, written when the buffer is created and refreshed every `meta_interval` stored
+    transitions, so a reopened buffer loses at most that many of the newest transitions.
+    """
+
+    def __init__(self, capacity, state_size, filename=None, seed=None, meta_interval=1000):
+        """
+        :param capacity: Maximum number of transitions kept.
+        :param state_size: Number of features in a state.
+        :param filename: Optional directory for a memory-mapped, persistent buffer.
+        :param seed: Seed for the sampling random generator.
+        :param meta_interval: Stored transitions between meta.json updates of a memory-mapped buffer.
+        """
+        self.capacity = int(capacity)
+        self.state_size = state_size
+        self.filename = filename
+        self.meta_interval = meta_interval
+        self._unsaved = 0  # Transitions stored since meta.json was last written
+        self.rng = np.random.default_rng(seed)
+        self.cursor = 0  # Next write position
+        self.size = 0  # Number of valid transitions
+
+        columns = {
+            "states": (np.float32, (self.capacity, state_size)),
+            "actions": (np.int32, (self.capacity,)),
+            "rewards": (np.float32, (self.capacity,)),
+            "next_states": (np.float32, (self.capacity, state_size)),
+            "dones": (np.bool_, (self.capacity,)),
+        }
+        if filename is None:
+            for name, (dtype, shape) in columns.items():
+                setattr(self, name, np.zeros(shape, dtype=dtype))
+        else:
+            self._open_memmap(columns)
+
+    def _open_memmap(self, columns):
+        """Open (or create) one memory-mapped .npy file per column and restore the cursor."""
+        os.makedirs(self.filename, exist_ok=True)
+        paths = {name: os.path.join(self.filename, f"{name}.npy") for name in columns}
+        existing = all(os.path.exists(path) for path in paths.values())
+        for name, (dtype, shape) in columns.items():
+            if existing:
+                column = np.lib.format.open_memmap(paths[name], mode="r+")
+                if column.shape != shape or column.dtype != dtype:
+                    raise ValueError(f"Replay buffer column {paths[name]} has shape {column.shape} and dtype "
+                                     f"{column.dtype}, expected {shape} and {np.dtype(dtype)}")
+            else:
+                column = np.lib.format.open_memmap(paths[name], mode="w+", dtype=dtype, shape=shape)
+            setattr(self, name, column)
+
+        meta_path = os.path.join(self.filename, "meta.json")
+        if existing and os.path.exists(meta_path):
+            with open(meta_path) as f:
+                meta = json.load(f)
+            self.cursor, self.size = meta["cursor"], meta["size"]
+        else:
+            self._write_meta()
+
+    def _write_meta(self):
+        """Atomically record the cursor and size next to the columns."""
+        meta_path = os.path.join(self.filename, "meta.json")
+        partial = f"{meta_path}.tmp"
+        with open(partial, "w") as f:
+            json.dump({"capacity": self.capacity, "state_size": self.state_size,
+                       "cursor": self.cursor, "size": self.size}, f)
+        os.replace(partial, meta_path)
+        self._unsaved = 0
+
+    def _stored(self, n):
+        """Count stored transitions and refresh meta.json every meta_interval of them (memory-mapped buffers only)."""
+        if self.filename is None:
+            return
+        self._unsaved += n
+        if self._unsaved >= self.meta_interval:
+            self._write_meta()
+
+    def __len__(self):
+        return self.size
+
+    def add(self, state, action, reward, next_state, done):
+        """Store a single transition. States may be flat or shaped (1, state_size)."""
+        i = self.cursor
+        self.states[i] = np.reshape(state, self.state_size)
+        self.actions[i] = action
+        self.rewards[i] = reward
+        self.next_states[i] = np.reshape(next_state, self.state_size)
+        self.dones[i] = done
+        self.cursor = (i + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+        self._stored(1)
+        return i
+
+    def add_batch(self, states, actions, rewards, next_states, dones):
+        """Store N transitions at once; returns the indices they were written to."""
+        n = len(actions)
+        indices = (self.cursor + np.arange(n)) % self.capacity
+        self.states[indices] = np.reshape(states, (n, self.state_size))
+        self.actions[indices] = actions
+        self.rewards[indices] = rewards
+        self.next_states[indices] = np.reshape(next_states, (n, self.state_size))
+        self.dones[indices] = dones
+        self.cursor = int((self.cursor + n) % self.capacity)
+        self.size = min(self.size + n, self.capacity)
+        self._stored(n)
+        return indices
+
+    def sample_indices(self, batch_size):
+        """Draw batch_size indices uniformly (with replacement) among stored transitions."""
+        return self.rng.integers(0, self.size, size=batch_size)
+
+    def gather(self, indices):
+        """Return (states, actions, rewards, next_states, dones) arrays for the given indices."""
+        return (
+            self.states[indices],
+            self.actions[indices],
+            self.rewards[indices],
+            self.next_states[indices],
+            self.dones[indices],
+        )
+
+    def sample(self, batch_size):
+        """Sample a ready-to-train minibatch of stacked arrays."""
+        return self.gather(self.sample_indices(batch_size))
+
+    def flush(self):
+        """Persist the memory-mapped columns and the write cursor (no-op for in-RAM buffers)."""
+        if self.filename is None:
+            return
+        for name in ("states", "actions", "rewards", "next_states", "dones"):
+            getattr(self, name).flush()
+        self._write_meta()
+
+    def nbytes(self):
+        """Total bytes held by the column arrays."""
+        return sum(getattr(self, name).nbytes for name in ("states", "actions", "rewards", "next_states", "dones"))
@@ -1,17 +1,100 @@
+import logging
 import os
 import sys
-import traci
+import tempfile
+from collections import namedtuple
 import numpy as np
+from Instrumentation import NULL_PROFILER, CountingTraci
+from NetworkTopology import NetworkTopology, Ramp
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = ("sumo-gui", "sumo", "libsumo")
+
+# TraCI variable IDs (identical in traci.constants and libsumo.constants)
+LAST_STEP_VEHICLE_NUMBER = 0x10
+VAR_WAITING_TIME = 0x7a
+VAR_INTERVAL_NUMBER = 0x25
+VAR_INTERVAL_TIMELOSS = 0x34
+
+# Signal plans selectable by the agent; the action window lasts red_duration seconds
+ACTIONS = [
+    {"green_duration": 5, "red_duration": 25},
+    {"green_duration": 10, "red_duration": 20},
+    {"green_duration": 15, "red_duration": 15},
+    {"green_duration": 20, "red_duration": 10},
+    {"green_duration": 25, "red_duration": 5},
+]
+
+# Relative importance of the reward terms
+REWARD_WEIGHTS = {
+    "flow_rate": 1.0,  # Encourage higher flow rates
+    "waiting_time": -0.7,  # Discourage long waiting times
+    "queue_length": -0.5  # Discourage long queues
+}
+
+# Everything get_state and get_reward need for one simulation step, read from subscriptions
+Observation = namedtuple("Observation", ["lane_vehicles", "edge_vehicles", "edge_waiting_time",
+                                         "detector_vehicles", "detector_time_loss"])
+
+# Metrics aggregated over one macro-step: vehicles that left through the exit detectors,
+# time loss accumulated on the monitored lanes (veh*s) and the largest sampled queue
+WindowMetrics = namedtuple("WindowMetrics", ["duration", "vehicles_passed", "delay", "max_queue"])
 
 class SumoEnvironment:
-    def __init__(self, sumo_cfg_file, traffic_light_id):
+    def __init__(self, sumo_cfg_file, traffic_light_id, backend="sumo-gui", warmup_steps=0, snapshot_reset=False,
+                 sumo_args=None, label=None, profiler=None, traci_module=None, macro_step_samples=5):
+        """
+        :param sumo_cfg_file: Path to the .sumocfg file.
+        :param traffic_light_id: ID of the ramp traffic light.
+        :param backend: "sumo-gui", headless "sumo" (both over TraCI) or in-process "libsumo".
+        :param warmup_steps: Simulation seconds to run after launching, before the first observation.
+        :param snapshot_reset: Save the simulation state after warm-up and restore it on later resets
+            instead of relaunching SUMO.
+        :param sumo_args: Extra command-line arguments passed to SUMO.
+        :param label: TraCI connection label, needed when several simulations share one process
+            (ignored by libsumo, which runs one simulation per process).
+        :param profiler: Optional Instrumentation.Profiler; when enabled, TraCI calls are counted and timed.
+        :param traci_module: Object implementing the TraCI API to use instead of the backend's module,
+            e.g. the deterministic stand-in in benchmarks/fake_traci.py; SUMO_HOME is then not required.
+        :param macro_step_samples: simulationStep calls per action window; the queue is sampled after each,
+            so more samples catch more of the window's peak queue at the cost of extra round-trips.
+        """
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown SUMO backend {backend!r}, expected one of {BACKENDS}")
         # Initialize SUMO environment settings
         self.sumo_cfg_file = sumo_cfg_file
         self.traffic_light_id = traffic_light_id
-        self.lanes = ["E3_1", "E9_0", "E9_1"]  # Define lanes
+        self.backend = backend
+        self.warmup_steps = warmup_steps
+        self.snapshot_reset = snapshot_reset
+        self.sumo_args = list(sumo_args or [])
+        self.label = label
+        self.profiler = profiler or NULL_PROFILER
+        self.traci_module = traci_module
+        self.snapshot_file = None  # Saved post-warm-up state, created on the first reset
+        self.running = False  # Whether a simulation is currently loaded
+        # Monitored sets derived from the network files (see NetworkTopology.ramp)
+        self.topology = NetworkTopology.load(sumo_cfg_file)
+        ramp = self.topology.ramp(traffic_light_id)
+        self.density_lane = ramp.density_lane  # Lane whose vehicle density is observed
+        self.queue_lane = ramp.queue_lane  # Ramp lane whose vehicle count is the queue length
+        self.waiting_edge = ramp.waiting_edge  # Ramp approach edge whose waiting time is observed
+        self.reward_edges = ramp.reward_edges  # Edges contributing flow and waiting time
+        self.reward_lanes = ramp.reward_lanes  # Lanes contributing queue length
+        self.delay_detectors = ramp.delay_detectors  # Lane-area detectors on the reward lanes
+        self.exit_detectors = ramp.exit_detectors  # Detectors counting vehicles leaving the network
+        self.macro_step_samples = macro_step_samples
+        # Static lane lengths come from the topology, never from TraCI
+        self.lane_lengths = self.topology.lane_length_of(set(self.reward_lanes) | {self.density_lane, self.queue_lane})
+        self.sim_time = 0.0  # Simulation time, tracked locally to avoid getTime round-trips
+        self.window = None  # WindowMetrics of the last macro-step
+        self._observation = None  # Cached Observation for the current simulation step
         self.state_size = 3  # Set state size to 3 as per the get_state return size (traffic_density, waiting_time, queue_length)
         self.action_size = 5  # Actions: Green or Red light
-        self._setup_sumo()
+        if traci_module is None:
+            self._setup_sumo()
+        self.traci = self._load_backend()
 
         self.cumulative_reward = 0  # Initialize cumulative reward
 
@@ -20,35 +103,156 @@ class SumoEnvironment:
         Extract the current traffic state.
         :return: State as a NumPy array.
         """
-        traffic_density = traci.lane.getLastStepVehicleNumber("E3_1") / traci.lane.getLength("E3_1")
-        queue_length = traci.lane.getLastStepVehicleNumber("E9_0")
-        waiting_time = traci.edge.getWaitingTime("E8")
+        observation = self.observe()
+        traffic_density = observation.lane_vehicles[self.density_lane] / self.lane_lengths[self.density_lane]
+        queue_length = observation.lane_vehicles[self.queue_lane]
+        waiting_time = observation.edge_waiting_time[self.waiting_edge]
         return np.array([traffic_density, waiting_time, queue_length])  # Return 3 values
 
+    def observe(self):
+        """
+        Return the Observation for the current simulation step.
+        The values come from the variable subscriptions registered at reset, which SUMO sends back
+        with each simulationStep, so reading them costs no extra TraCI round-trips.
+        """
+        if self._observation is None:
+            lane_results = self.traci.lane.getAllSubscriptionResults()
+            edge_results = self.traci.edge.getAllSubscriptionResults()
+            detector_results = self.traci.lanearea.getAllSubscriptionResults()
+            self._observation = Observation(
+                lane_vehicles={lane: values[LAST_STEP_VEHICLE_NUMBER] for lane, values in lane_results.items()},
+                edge_vehicles={edge: values[LAST_STEP_VEHICLE_NUMBER] for edge, values in edge_results.items()},
+                edge_waiting_time={edge: values[VAR_WAITING_TIME] for edge, values in edge_results.items()},
+                detector_vehicles={det: values[VAR_INTERVAL_NUMBER] for det, values in detector_results.items()},
+                # The detectors report the mean time loss per vehicle seen; multiply back to a running total
+                detector_time_loss={det: values[VAR_INTERVAL_NUMBER] * values[VAR_INTERVAL_TIMELOSS]
+                                    for det, values in detector_results.items()},
+            )
+        return self._observation
+
+    def _subscribe(self):
+        """Register the per-step variable subscriptions."""
+        monitored_lanes = set(self.reward_lanes) | {self.density_lane, self.queue_lane}
+        monitored_edges = set(self.reward_edges) | {self.waiting_edge}
+        for lane in monitored_lanes:
+            self.traci.lane.subscribe(lane, [LAST_STEP_VEHICLE_NUMBER])
+        for edge in monitored_edges:
+            self.traci.edge.subscribe(edge, [LAST_STEP_VEHICLE_NUMBER, VAR_WAITING_TIME])
+        for detector in set(self.delay_detectors) | set(self.exit_detectors):
+            self.traci.lanearea.subscribe(detector, [VAR_INTERVAL_NUMBER, VAR_INTERVAL_TIMELOSS])
+        self.sim_time = self.traci.simulation.getTime()
+        self.window = None
+        self._observation = None
+
+    def queue_length(self, observation):
+        """Number of vehicles on the queue-monitored lanes."""
+        return sum(observation.lane_vehicles[lane] for lane in self.reward_lanes)
+
+    def macro_step(self, duration):
+        """
+        Advance the simulation by `duration` seconds in macro_step_samples simulationStep(targetTime) calls
+        and aggregate the window metrics from the detector totals at both ends.
+        :return: WindowMetrics for the elapsed window.
+        """
+        start = self.observe()
+        max_queue = self.queue_length(start)
+        begin = self.sim_time
+        with self.profiler.phase("env.simulation_step"):
+            for k in range(1, self.macro_step_samples + 1):
+                self.sim_time = begin + duration * k / self.macro_step_samples
+                self._simulation_step(self.sim_time)
+                max_queue = max(max_queue, self.queue_length(self.observe()))
+        self.profiler.count("sim_seconds", duration)
+        end = self.observe()
+        self.window = WindowMetrics(
+            duration=duration,
+            vehicles_passed=sum(end.detector_vehicles[d] - start.detector_vehicles[d] for d in self.exit_detectors),
+            delay=sum(end.detector_time_loss[d] - start.detector_time_loss[d] for d in self.delay_detectors),
+            max_queue=max_queue,
+        )
+        return self.window
+
+    def _simulation_step(self, *args):
+        """Advance the simulation and invalidate the cached observation."""
+        self.traci.simulationStep(*args)
+        self._observation = None
+
     def reset(self):
         """Reset the environment."""
+        self.cumulative_reward = 0
+        if self.snapshot_reset and self.running and self.snapshot_file is not None:
+            # Restore the post-warm-up state instead of relaunching the simulator
+            self.traci.simulation.loadState(self.snapshot_file)
+            self._subscribe()
+            return self.get_state()
+
         try:
             # Try to start the SUMO connection (if already active, it will raise an error)
-            traci.start(['sumo-gui', '-c', self.sumo_cfg_file])
-        except traci.TraCIException:
+            self._start()
+        except self.traci.TraCIException:
             # If a connection is already active, we handle it by closing it and restarting
-            print("Connection already active. Closing and restarting.")
+            logger.warning("Connection already active. Closing and restarting.")
             try:
-                traci.close()  # Try to close the existing connection
-            except traci.exceptions.FatalTraCIError:
+                self.traci.close()  # Try to close the existing connection
+            except self.traci.FatalTraCIError:
                 # If not connected, we just ignore the error
                 pass
-            traci.start(['sumo-gui', '-c', self.sumo_cfg_file])  # Start a new connection
+            self._start()  # Start a new connection
+        self.running = True
+
+        if self.warmup_steps > 0:
+            self._simulation_step(self.traci.simulation.getTime() + self.warmup_steps)
+        if self.snapshot_reset:
+            if self.snapshot_file is None:
+                handle, self.snapshot_file = tempfile.mkstemp(prefix="sumo_snapshot_", suffix=".sbx")
+                os.close(handle)
+            self.traci.simulation.saveState(self.snapshot_file)
+        self._subscribe()
 
         # Reset the state or return any other required value
         return self.get_state()
 
+    def _start(self):
+        """Launch SUMO; TraCI picks a free port for each labelled connection."""
+        if self.backend == "libsumo" or self.label is None:
+            self.traci.start(self._sumo_command())
+        else:
+            self.traci.start(self._sumo_command(), label=self.label)
+
+    def _sumo_command(self):
+        """Command line used to launch SUMO for the selected backend."""
+        binary = "sumo" if self.backend == "libsumo" else self.backend
+        return [binary, '-c', self.sumo_cfg_file] + self.sumo_args
+
+    def _load_backend(self):
+        """Return the module implementing the TraCI API for the selected backend."""
+        if self.traci_module is not None:
+            module = self.traci_module
+        elif self.backend == "libsumo":
+            import libsumo as module
+        else:
+            import traci as module
+        if self.profiler.enabled:
+            return CountingTraci(module, self.profiler)
+        return module
+
     def _setup_sumo(self):
-        """Ensure SUMO_HOME is set and add its tools to PATH."""
-        if "SUMO_HOME" not in os.environ:
-            sys.exit("Please declare the environment variable 'SUMO_HOME'")
-        tools = os.path.join(os.environ['SUMO_HOME'], 'tools')
-        sys.path.append(tools)
+        """
+        Locate SUMO (SUMO_HOME, or the pip-installed eclipse-sumo package) and add its tools to the path.
+        Raises RuntimeError for the TraCI backends if SUMO cannot be found; the pip libsumo wheel needs neither.
+        """
+        sumo_home = os.environ.get("SUMO_HOME")
+        if sumo_home is None:
+            try:
+                import sumo
+                sumo_home = sumo.SUMO_HOME
+            except (ImportError, AttributeError):
+                if self.backend == "libsumo":
+                    return
+                raise RuntimeError("Please declare the environment variable 'SUMO_HOME'") from None
+        tools = os.path.join(sumo_home, 'tools')
+        if tools not in sys.path:
+            sys.path.append(tools)
 
 
     def take_action(self, action):
@@ -56,26 +260,22 @@ class SumoEnvironment:
         Apply an action to the traffic light.
         :param action: Action index corresponding to a traffic light configuration.
         """
-        actions = [
-            {"green_duration": 5, "red_duration": 25},
-            {"green_duration": 10, "red_duration": 20},
-            {"green_duration": 15, "red_duration": 15},
-            {"green_duration": 20, "red_duration": 10},
-            {"green_duration": 25, "red_duration": 5},
-        ]
-        selected_action = actions[action]
-        traci.trafficlight.setPhaseDuration(self.traffic_light_id, selected_action["green_duration"])
-        for _ in range(selected_action["red_duration"]):
-            traci.simulationStep()
+        selected_action = ACTIONS[action]
+        self.traci.trafficlight.setPhaseDuration(self.traffic_light_id, selected_action["green_duration"])
+        return self.macro_step(selected_action["red_duration"])
 
     def get_reward(self):
         """
         Compute the reward based on traffic metrics for multiple edges.
+        After a macro-step the flow and waiting terms are the window's vehicles passed and accumulated
+        delay per simulated second, and the queue term its max queue, so windows of different lengths
+        score on the same scale; otherwise all three are read at the current instant.
         :return: Reward value.
         """
         # Define the edges and their associated lanes for metric calculation
-        edges = ["E5", "E3", "E6", "E8", "E9"]
-        lanes = ["E9_0", "E5_0", "E6_0", "E8_0"]  # Example lanes to monitor queue lengths
+        edges = self.reward_edges
+        lanes = self.reward_lanes  # Example lanes to monitor queue lengths
+        observation = self.observe()
 
         # Initialize metrics
         total_flow = 0
@@ -85,21 +285,22 @@ class SumoEnvironment:
         # Collect metrics for each edge
         for edge in edges:
             # Traffic flow: Number of vehicles passing through the edge
-            total_flow += traci.edge.getLastStepVehicleNumber(edge)
+            total_flow += observation.edge_vehicles[edge]
             # Waiting time: Total waiting time on the edge
-            total_waiting_time += traci.edge.getWaitingTime(edge)
+            total_waiting_time += observation.edge_waiting_time[edge]
 
         # Collect metrics for specific lanes
         for lane in lanes:
             # Queue length: Number of vehicles waiting in the lane
-            total_queue_length += traci.lane.getLastStepVehicleNumber(lane)
+            total_queue_length += observation.lane_vehicles[lane]
+
+        if self.window is not None:
+            total_flow = self.window.vehicles_passed / self.window.duration
+            total_waiting_time = self.window.delay / self.window.duration
+            total_queue_length = self.window.max_queue
 
         # Adjust weights to reflect the relative importance of different factors
-        weights = {
-            "flow_rate": 1.0,  # Encourage higher flow rates
-            "waiting_time": -0.7,  # Discourage long waiting times
-            "queue_length": -0.5  # Discourage long queues
-        }
+        weights = REWARD_WEIGHTS
 
         # Calculate the weighted reward
         reward = (
@@ -124,17 +325,16 @@ class SumoEnvironment:
         :param max_steps: Maximum number of steps before ending the episode.
         :return: Next state, reward, and done flag.
         """
-        # Apply the action (green or red light)
+        # Apply the action (green or red light) and advance through its window
         self.take_action(action)
-        
-        # Step the simulation forward
-        traci.simulationStep()
 
-        # Get the current state after the simulation step
-        state = self.get_state()
+        with self.profiler.phase("env.observe"):
+            # Get the current state after the simulation step
+            state = self.get_state()
 
-        # Calculate the reward for the current step
-        reward = self.get_reward()
+            # Calculate the reward for the current step
+            reward = self.get_reward()
+        self.profiler.count("env_steps")
 
         # Accumulate the reward for future evaluations (cumulative rewards)
         self.cumulative_reward += reward
@@ -149,4 +349,8 @@ class SumoEnvironment:
 
     def close(self):
         """Close the SUMO simulation."""
-        traci.close()
+        self.traci.close()
+        self.running = False
+        if self.snapshot_file is not None and os.path.exists(self.snapshot_file):
+            os.remove(self.snapshot_file)
+        self.snapshot_file = None
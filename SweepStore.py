@@ -0,0 +1,118 @@
+import json
+import sqlite3
+import time
+
+import numpy as np
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS trials (
+    id INTEGER PRIMARY KEY,
+    params TEXT UNIQUE NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    final_reward REAL,
+    episodes_done INTEGER NOT NULL DEFAULT 0,
+    started REAL,
+    finished REAL,
+    error TEXT
+);
+CREATE TABLE IF NOT EXISTS episodes (
+    trial_id INTEGER NOT NULL REFERENCES trials(id),
+    episode INTEGER NOT NULL,
+    reward REAL NOT NULL,
+    PRIMARY KEY (trial_id, episode)
+);
+"""
+
+# Trial states; only pending trials are (re)started by a sweep
+PENDING, RUNNING, COMPLETE, PRUNED, FAILED = "pending", "running", "complete", "pruned", "failed"
+
+
+class SweepStore:
+    """
+    SQLite record of a hyperparameter sweep: one row per trial and one per finished episode.
+
+    Every process opens its own connection to the same file; WAL journaling lets trials report
+    episodes while others read the per-episode rewards used for pruning. Trials are keyed by their
+    parameters, so adding the same search space again only adds the trials that are missing.
+    """
+
+    def __init__(self, path, timeout=30.0):
+        """
+        :param path: SQLite database file, created if missing.
+        :param timeout: Seconds to wait for a lock held by another process.
+        """
+        self.path = path
+        self.connection = sqlite3.connect(path, timeout=timeout)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.executescript(SCHEMA)
+
+    @staticmethod
+    def key(params):
+        """Canonical JSON of a parameter dict, used as the trial's identity."""
+        return json.dumps(params, sort_keys=True)
+
+    def add_trials(self, param_sets):
+        """Insert trials that are not in the store yet. :return: Number of new trials."""
+        before = self.connection.total_changes
+        with self.connection:
+            self.connection.executemany("INSERT OR IGNORE INTO trials (params) VALUES (?)",
+                                        [(self.key(params),) for params in param_sets])
+        return self.connection.total_changes - before
+
+    def requeue_interrupted(self):
+        """Mark trials left running by an interrupted sweep as pending again and drop their partial episodes."""
+        with self.connection:
+            rows = self.connection.execute("SELECT id FROM trials WHERE status = ?", (RUNNING,)).fetchall()
+            self.connection.executemany("DELETE FROM episodes WHERE trial_id = ?", rows)
+            self.connection.execute("UPDATE trials SET status = ?, episodes_done = 0, started = NULL WHERE status = ?",
+                                    (PENDING, RUNNING))
+        return len(rows)
+
+    def pending(self):
+        """:return: List of (trial id, params dict) still to run."""
+        rows = self.connection.execute("SELECT id, params FROM trials WHERE status = ? ORDER BY id", (PENDING,))
+        return [(trial_id, json.loads(params)) for trial_id, params in rows]
+
+    def start(self, trial_id):
+        with self.connection:
+            self.connection.execute("UPDATE trials SET status = ?, started = ? WHERE id = ?", (RUNNING, time.time(), trial_id))
+
+    def report(self, trial_id, episode, reward):
+        """Record the total reward of one finished episode."""
+        with self.connection:
+            self.connection.execute("INSERT OR REPLACE INTO episodes VALUES (?, ?, ?)", (trial_id, episode, reward))
+            self.connection.execute("UPDATE trials SET episodes_done = ? WHERE id = ?", (episode + 1, trial_id))
+
+    def finish(self, trial_id, status, final_reward=None, error=None):
+        with self.connection:
+            self.connection.execute("UPDATE trials SET status = ?, final_reward = ?, finished = ?, error = ? "
+                                    "WHERE id = ?", (status, final_reward, time.time(), error, trial_id))
+
+    def episode_rewards(self, episode, exclude=None):
+        """Rewards reported by other trials for the same episode."""
+        rows = self.connection.execute("SELECT reward FROM episodes WHERE episode = ? AND trial_id != ?",
+                                       (episode, -1 if exclude is None else exclude))
+        return np.array([reward for reward, in rows])
+
+    def should_prune(self, trial_id, episode, reward, min_trials=4, percentile=50.0, warmup_episodes=1):
+        """
+        Median-style stopping rule: prune when this episode's reward is below the given percentile of
+        the rewards other trials reached in the same episode.
+        :param min_trials: Other trials that must have reported this episode before anything is pruned.
+        :param warmup_episodes: Episodes every trial runs before it can be pruned.
+        """
+        if episode < warmup_episodes:
+            return False
+        others = self.episode_rewards(episode, exclude=trial_id)
+        return len(others) >= min_trials and reward < np.percentile(others, percentile)
+
+    def results(self):
+        """:return: List of dicts for every trial, best final reward first."""
+        rows = self.connection.execute(
+            "SELECT id, params, status, final_reward, episodes_done, started, finished, error FROM trials "
+            "ORDER BY final_reward IS NULL, final_reward DESC, id")
+        names = ["id", "params", "status", "final_reward", "episodes_done", "started", "finished", "error"]
+        return [dict(zip(names, row), params=json.loads(row[1])) for row in rows]
+
+    def close(self):
+        self.connection.close()
@@ -0,0 +1,173 @@
+import json
+import os
+import queue
+import threading
+
+import numpy as np
+
+# Column dtypes, identical to ReplayBuffer so recorded shards can be fed to the same training code
+COLUMNS = {
+    "states": np.float32,
+    "actions": np.int32,
+    "rewards": np.float32,
+    "next_states": np.float32,
+    "dones": np.bool_,
+}
+
+
+class TransitionRecorder:
+    """
+    Streams transitions into a sharded on-disk dataset.
+
+    Transitions are buffered in one shard's worth of preallocated arrays; a full shard is written
+    as a directory of .npy column files (shard_00000/states.npy, ...) and listed in dataset.json
+    with its size, so readers only ever see complete shards. Recording into an existing dataset
+    appends new shards after the old ones.
+    """
+
+    def __init__(self, directory, state_size, shard_size=65536, action_size=None):
+        """
+        :param directory: Dataset directory, created if missing.
+        :param state_size: Number of features in a state.
+        :param shard_size: Transitions per shard file set.
+        :param action_size: Number of discrete actions, stored in dataset.json for training.
+        """
+        self.directory = directory
+        self.state_size = state_size
+        self.action_size = action_size
+        self.shard_size = shard_size
+        self.size = 0  # Transitions buffered for the current shard
+        self.buffers = {name: np.zeros((shard_size, state_size) if name.endswith("states") else shard_size, dtype=dtype)
+                        for name, dtype in COLUMNS.items()}
+
+        os.makedirs(directory, exist_ok=True)
+        self.index_path = os.path.join(directory, "dataset.json")
+        if os.path.exists(self.index_path):
+            with open(self.index_path) as f:
+                self.index = json.load(f)
+            if self.index["state_size"] != state_size:
+                raise ValueError(f"Dataset at {directory} has state size {self.index['state_size']}, expected {state_size}")
+            recorded = self.index.get("action_size")
+            if action_size is not None and recorded is not None and recorded != action_size:
+                raise ValueError(f"Dataset at {directory} has action size {recorded}, expected {action_size}")
+            self.index["action_size"] = recorded if action_size is None else action_size
+        else:
+            self.index = {"state_size": state_size, "action_size": action_size, "shards": []}
+
+    def add(self, state, action, reward, next_state, done):
+        """Record one transition. States may be flat or shaped (1, state_size)."""
+        i = self.size
+        self.buffers["states"][i] = np.reshape(state, self.state_size)
+        self.buffers["actions"][i] = action
+        self.buffers["rewards"][i] = reward
+        self.buffers["next_states"][i] = np.reshape(next_state, self.state_size)
+        self.buffers["dones"][i] = done
+        self.size += 1
+        if self.size == self.shard_size:
+            self.flush()
+
+    def flush(self):
+        """Write the buffered transitions as a new shard (possibly smaller than shard_size)."""
+        if self.size == 0:
+            return
+        name = f"shard_{len(self.index['shards']):05d}"
+        path = os.path.join(self.directory, name)
+        os.makedirs(path, exist_ok=True)
+        for column, values in self.buffers.items():
+            np.save(os.path.join(path, f"{column}.npy"), values[:self.size])
+        self.index["shards"].append({"name": name, "size": self.size})
+        # Publish the shard only after its columns are complete
+        partial = f"{self.index_path}.tmp"
+        with open(partial, "w") as f:
+            json.dump(self.index, f, indent=2)
+        os.replace(partial, self.index_path)
+        self.size = 0
+
+    def close(self):
+        self.flush()
+
+
+class TransitionDataset:
+    """
+    Read-only view of a dataset written by TransitionRecorder.
+
+    Shards are opened as memory maps, so only the pages of the sampled rows are read and datasets
+    far larger than RAM can be trained on. batches() shuffles shard order and rows within each
+    shard, and a background thread assembles the next minibatches while the caller trains.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        with open(os.path.join(directory, "dataset.json")) as f:
+            index = json.load(f)
+        self.state_size = index["state_size"]
+        self.action_size = index.get("action_size")  # None for datasets recorded without it
+        self.shards = [
+            {column: np.load(os.path.join(directory, shard["name"], f"{column}.npy"), mmap_mode="r")
+             for column in COLUMNS}
+            for shard in index["shards"]
+        ]
+        self.shard_sizes = np.array([shard["size"] for shard in index["shards"]], dtype=np.int64)
+
+    def __len__(self):
+        return int(self.shard_sizes.sum())
+
+    def _iter_batches(self, batch_size, epochs, shuffle, seed):
+        rng = np.random.default_rng(seed)
+        for _ in range(epochs):
+            shard_order = rng.permutation(len(self.shards)) if shuffle else np.arange(len(self.shards))
+            for s in shard_order:
+                shard = self.shards[s]
+                rows = rng.permutation(self.shard_sizes[s]) if shuffle else np.arange(self.shard_sizes[s])
+                for start in range(0, len(rows), batch_size):
+                    # Sorted row indices make each gather a forward scan through the mapped file
+                    indices = np.sort(rows[start:start + batch_size])
+                    yield tuple(np.asarray(shard[column][indices]) for column in COLUMNS)
+
+    def batches(self, batch_size, epochs=1, shuffle=True, seed=None, prefetch=4):
+        """
+        Yield (states, actions, rewards, next_states, dones) minibatches covering the dataset once per epoch.
+        :param prefetch: Batches assembled ahead by a background thread (0 reads them inline).
+        """
+        if prefetch <= 0:
+            yield from self._iter_batches(batch_size, epochs, shuffle, seed)
+            return
+        batches = queue.Queue(maxsize=prefetch)
+        stop = threading.Event()
+        end = object()
+        errors = []
+
+        def produce():
+            try:
+                for batch in self._iter_batches(batch_size, epochs, shuffle, seed):
+                    while not stop.is_set():
+                        try:
+                            batches.put(batch, timeout=0.1)
+                            break
+                        except queue.Full:
+                            continue
+                    if stop.is_set():
+                        return
+            except Exception as error:
+                errors.append(error)
+            finally:
+                batches.put(end)
+
+        thread = threading.Thread(target=produce, daemon=True)
+        thread.start()
+        try:
+            while True:
+                batch = batches.get()
+                if batch is end:
+                    if errors:
+                        raise errors[0]
+                    return
+                yield batch
+        finally:
+            # Let the producer exit if the consumer stops early
+            stop.set()
+            while thread.is_alive():
+                try:
+                    batches.get_nowait()
+                except queue.Empty:
+                    thread.join(0.01)
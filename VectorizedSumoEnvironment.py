@@ -0,0 +1,105 @@
+import multiprocessing as mp
+import os
+import random
+import numpy as np
+
+
+def _worker(remote, parent_remote, env_class, env_kwargs, seed):
+    """Own one environment in a child process and serve reset/step/close commands over a pipe."""
+    parent_remote.close()
+    random.seed(seed)
+    np.random.seed(seed)
+    env = env_class(**env_kwargs)
+    try:
+        while True:
+            command, data = remote.recv()
+            if command == "reset":
+                remote.send(env.reset())
+            elif command == "step":
+                action, step_count, max_steps = data
+                state, reward, done = env.step(action, step_count=step_count, max_steps=max_steps)
+                remote.send((state, reward, done))
+            elif command == "call":
+                name, args = data
+                remote.send(getattr(env, name)(*args))
+            elif command == "close":
+                env.close()
+                remote.send(None)
+                break
+    except KeyboardInterrupt:
+        pass
+    finally:
+        remote.close()
+
+
+class VectorizedSumoEnvironment:
+    """
+    Run N independent SUMO environments in worker processes and step them in lockstep.
+
+    Each worker builds its own environment (so its own SUMO instance, TraCI connection label and
+    port, or its own in-process libsumo) and SUMO random seed, and writes its metrics log and
+    recorded transitions to an env_<i> subdirectory of metrics_dir and record_dir. reset() and
+    step() return arrays stacked along the first axis so one forward pass of the agent can act
+    for every environment.
+    """
+
+    def __init__(self, num_envs, env_class, seed=0, start_method="spawn", **env_kwargs):
+        """
+        :param num_envs: Number of parallel environments.
+        :param env_class: SumoEnvironment subclass to instantiate in each worker.
+        :param seed: Base seed; worker i uses seed + i for Python, NumPy and SUMO.
+        :param start_method: multiprocessing start method ("spawn" is safe with TensorFlow in the parent).
+        :param env_kwargs: Keyword arguments for env_class (sumo_cfg_file, traffic_light_id, backend, ...).
+        """
+        self.num_envs = num_envs
+        ctx = mp.get_context(start_method)
+        self.remotes, self.processes = [], []
+        for i in range(num_envs):
+            kwargs = dict(env_kwargs)
+            kwargs["sumo_args"] = list(kwargs.get("sumo_args") or []) + ["--seed", str(seed + i)]
+            kwargs["label"] = f"env_{i}"
+            if kwargs.get("demand_seed") is not None:
+                kwargs["demand_seed"] = kwargs["demand_seed"] + i  # Independent demand per worker
+            for name in ("metrics_dir", "record_dir"):
+                if kwargs.get(name):
+                    kwargs[name] = os.path.join(kwargs[name], f"env_{i}")  # One log/dataset per worker
+            remote, work_remote = ctx.Pipe()
+            process = ctx.Process(target=_worker, args=(work_remote, remote, env_class, kwargs, seed + i), daemon=True)
+            process.start()
+            work_remote.close()
+            self.remotes.append(remote)
+            self.processes.append(process)
+
+        # Sizes are identical for every worker
+        self.state_size = self.call("__getattribute__", "state_size")[0]
+        self.action_size = self.call("__getattribute__", "action_size")[0]
+
+    def reset(self):
+        """Reset every environment. :return: States stacked as (num_envs, state_size)."""
+        for remote in self.remotes:
+            remote.send(("reset", None))
+        return np.stack([remote.recv() for remote in self.remotes])
+
+    def step(self, actions, step_count, max_steps):
+        """
+        Step every environment with its own action.
+        :return: states (num_envs, state_size), rewards (num_envs,), dones (num_envs,).
+        """
+        for remote, action in zip(self.remotes, actions):
+            remote.send(("step", (int(action), step_count, max_steps)))
+        results = [remote.recv() for remote in self.remotes]
+        states, rewards, dones = zip(*results)
+        return np.stack(states), np.array(rewards, dtype=np.float32), np.array(dones, dtype=bool)
+
+    def call(self, name, *args):
+        """Call a method on every worker's environment and return the list of results."""
+        for remote in self.remotes:
+            remote.send(("call", (name, args)))
+        return [remote.recv() for remote in self.remotes]
+
+    def close(self):
+        for remote in self.remotes:
+            remote.send(("close", None))
+            remote.recv()
+        for process in self.processes:
+            process.join()
@@ -0,0 +1,51 @@
+"""
+Measure resets per second and env steps per second for each SUMO backend.
+
+Usage: python benchmarks/bench_backends.py [--backends sumo libsumo] [--resets 5] [--steps 20]
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from SumoEnvironment import SumoEnvironment
+
+CFG = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "ProjectFinal.sumocfg")
+
+
+def bench(backend, snapshot_reset, resets, steps, warmup_steps):
+    env = SumoEnvironment(CFG, "J12", backend=backend, warmup_steps=warmup_steps, snapshot_reset=snapshot_reset,
+                          sumo_args=["--no-step-log", "--no-warnings"])
+    with contextlib.redirect_stdout(io.StringIO()):
+        env.reset()
+        start = time.perf_counter()
+        for _ in range(resets):
+            env.reset()
+        reset_rate = resets / (time.perf_counter() - start)
+
+        start = time.perf_counter()
+        for step in range(steps):
+            env.step(step % env.action_size, step_count=step, max_steps=steps)
+        step_rate = steps / (time.perf_counter() - start)
+    env.close()
+    return reset_rate, step_rate
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--backends", nargs="+", default=["sumo", "libsumo"])
+    parser.add_argument("--resets", type=int, default=5)
+    parser.add_argument("--steps", type=int, default=20)
+    parser.add_argument("--warmup-steps", type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"{'backend':<10} {'reset mode':<10} {'resets/s':>10} {'steps/s':>10}")
+    for backend in args.backends:
+        for snapshot_reset in (False, True):
+            reset_rate, step_rate = bench(backend, snapshot_reset, args.resets, args.steps, args.warmup_steps)
+            mode = "snapshot" if snapshot_reset else "relaunch"
+            print(f"{backend:<10} {mode:<10} {reset_rate:>10.2f} {step_rate:>10.2f}")
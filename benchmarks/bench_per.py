@@ -0,0 +1,101 @@
+"""
+Compare uniform and prioritized replay by the training steps DQNAgent needs to reach a reward threshold.
+
+Each seed trains one agent per replay mode on the cell-transmission surrogate with demand noise. The
+threshold sits --fraction of the way from a uniformly random policy to the best fixed signal plan,
+both measured on the same seeds; an agent reaches it once the mean return of its last --window
+training episodes does.
+
+Usage: python benchmarks/bench_per.py [--seeds 0 1 2] [--episodes 20] [--max-steps 50] [--fraction 0.75]
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from CellTransmissionEnvironment import CellTransmissionEnvironment
+
+DEMAND_NOISE = 0.2
+
+
+def fixed_returns(seed, max_steps):
+    """:return: (mean return of uniformly random actions, return of the best fixed action) for one seed."""
+    env = CellTransmissionEnvironment(seed=seed, demand_noise=DEMAND_NOISE)
+    rng = np.random.default_rng(seed)
+    returns = {}
+    for name in ["random"] + list(range(env.action_size)):
+        env.reset()
+        total = 0.0
+        for step in range(max_steps):
+            action = rng.integers(env.action_size) if name == "random" else name
+            _, reward, _ = env.step(action, step_count=step, max_steps=max_steps)
+            total += reward
+        returns[name] = total
+    return returns.pop("random"), max(returns.values())
+
+
+def steps_to_threshold(prioritized, seed, threshold, episodes, max_steps, batch_size, window):
+    """
+    Train one agent and return the agent steps taken when the windowed mean return first reached threshold.
+    :return: (steps or None if never reached, final windowed mean return)
+    """
+    import keras
+    from DQNAgent import DQNAgent
+
+    keras.utils.set_random_seed(seed)
+    env = CellTransmissionEnvironment(seed=seed, demand_noise=DEMAND_NOISE)
+    agent = DQNAgent(env.state_size, env.action_size, prioritized_replay=prioritized)
+    returns, steps, reached = [], 0, None
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(episodes):
+            state = np.reshape(env.reset(), [1, env.state_size])
+            total = 0.0
+            for step in range(max_steps):
+                action = agent.act(state)
+                next_state, reward, done = env.step(action, step_count=step, max_steps=max_steps)
+                next_state = np.reshape(next_state, [1, env.state_size])
+                agent.remember(state, action, reward, next_state, done)
+                state = next_state
+                total += reward
+                steps += 1
+                if len(agent.memory) > batch_size:
+                    agent.replay(batch_size)
+            returns.append(total)
+            if reached is None and len(returns) >= window and np.mean(returns[-window:]) >= threshold:
+                reached = steps
+    env.close()
+    return reached, float(np.mean(returns[-window:]))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--seeds", type=int, nargs="+", default=[0, 1, 2])
+    parser.add_argument("--episodes", type=int, default=20)
+    parser.add_argument("--max-steps", type=int, default=50)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--window", type=int, default=3, help="Episodes averaged before comparing to the threshold")
+    parser.add_argument("--fraction", type=float, default=0.75,
+                        help="Threshold position between the random policy (0) and the best fixed plan (1)")
+    args = parser.parse_args()
+
+    results = {"uniform": [], "prioritized": []}
+    for seed in args.seeds:
+        random_return, best_fixed = fixed_returns(seed, args.max_steps)
+        threshold = random_return + args.fraction * (best_fixed - random_return)
+        for name, prioritized in (("uniform", False), ("prioritized", True)):
+            steps, final = steps_to_threshold(prioritized, seed, threshold, args.episodes, args.max_steps,
+                                              args.batch_size, args.window)
+            results[name].append(steps)
+            print(f"seed {seed} {name:<11} threshold {threshold:10.1f}  final {final:10.1f}  "
+                  f"steps to threshold {steps if steps is not None else 'not reached'}")
+
+    budget = args.episodes * args.max_steps
+    for name, steps in results.items():
+        reached = [s for s in steps if s is not None]
+        median = f"{np.median(reached):.0f}" if reached else "-"
+        print(f"{name:<11} reached {len(reached)}/{len(steps)} seeds within {budget} steps, median {median} steps")
@@ -0,0 +1,49 @@
+"""
+Measure DQNAgent.replay updates per second for the per-sample and batched paths.
+
+Usage: python benchmarks/bench_replay.py [--batch-size 64] [--updates 20]
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from DQNAgent import DQNAgent
+
+
+def fill_memory(agent, n):
+    rng = np.random.default_rng(0)
+    for _ in range(n):
+        state = rng.random((1, agent.state_size))
+        next_state = rng.random((1, agent.state_size))
+        agent.remember(state, int(rng.integers(agent.action_size)), float(rng.normal()), next_state, False)
+
+
+def updates_per_second(batched, batch_size, updates):
+    agent = DQNAgent(state_size=3, action_size=5, batched_replay=batched)
+    fill_memory(agent, 2000)
+    with contextlib.redirect_stdout(io.StringIO()):
+        agent.replay(batch_size)  # Warm-up: trace the Keras functions once
+        start = time.perf_counter()
+        for _ in range(updates):
+            agent.replay(batch_size)
+        elapsed = time.perf_counter() - start
+    return updates / elapsed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--updates", type=int, default=20)
+    args = parser.parse_args()
+
+    per_sample = updates_per_second(False, args.batch_size, max(1, args.updates // 10))
+    batched = updates_per_second(True, args.batch_size, args.updates)
+    print(f"per-sample replay: {per_sample:.2f} replay calls/s")
+    print(f"batched replay:    {batched:.2f} replay calls/s ({batched / per_sample:.0f}x)")
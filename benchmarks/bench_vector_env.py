@@ -0,0 +1,48 @@
+"""
+Measure environment steps per second of VectorizedSumoEnvironment for increasing worker counts.
+
+Usage: python benchmarks/bench_vector_env.py [--num-envs 1 2 4] [--steps 10] [--backend libsumo]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from DynamicFlowSumoEnvironment import DynamicFlowSumoEnvironment
+from VectorizedSumoEnvironment import VectorizedSumoEnvironment
+
+
+def steps_per_second(num_envs, steps, backend):
+    envs = VectorizedSumoEnvironment(num_envs, DynamicFlowSumoEnvironment,
+                                     sumo_cfg_file=os.path.join(ROOT, "ProjectFinal.sumocfg"),
+                                     traffic_light_id="J12", backend=backend,
+                                     sumo_args=["--no-step-log", "--no-warnings"])
+    envs.reset()
+    rng = np.random.default_rng(0)
+    start = time.perf_counter()
+    for step in range(steps):
+        envs.step(rng.integers(envs.action_size, size=num_envs), step_count=step, max_steps=steps)
+    elapsed = time.perf_counter() - start
+    envs.close()
+    return num_envs * steps / elapsed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--num-envs", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--steps", type=int, default=10)
+    parser.add_argument("--backend", default="libsumo")
+    args = parser.parse_args()
+
+    print(f"cores available: {os.cpu_count()}")
+    print(f"{'envs':>5} {'steps/s':>10} {'speedup':>8}")
+    base = None
+    for num_envs in args.num_envs:
+        rate = steps_per_second(num_envs, args.steps, args.backend)
+        base = base or rate
+        print(f"{num_envs:>5} {rate:>10.2f} {rate / base:>8.2f}")
@@ -0,0 +1,156 @@
+"""
+Deterministic stand-in for the traci module, driven by the cell transmission surrogate.
+
+It implements the subset of the TraCI API used by SumoEnvironment and DynamicFlowSumoEnvironment
+(start/close, simulationStep, state save/load, subscriptions on lanes, edges and lane-area
+detectors, setPhaseDuration, vehicle.add and vehicle.setLaneChangeMode), so environment code
+paths can be benchmarked without SUMO installed. Every run with the same calls produces the same
+numbers.
+"""
+import copy
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from CellTransmissionEnvironment import EDGES, CellTransmissionEnvironment
+
+LAST_STEP_VEHICLE_NUMBER = 0x10
+VAR_WAITING_TIME = 0x7a
+VAR_INTERVAL_NUMBER = 0x25
+VAR_INTERVAL_TIMELOSS = 0x34
+
+
+class TraCIException(Exception):
+    pass
+
+
+class FatalTraCIError(Exception):
+    pass
+
+
+class _Domain:
+    def __init__(self, sim):
+        self._sim = sim
+        self._subscriptions = {}
+
+    def subscribe(self, object_id, variables):
+        self._subscriptions[object_id] = list(variables)
+
+    def getAllSubscriptionResults(self):
+        return {object_id: {var: self._value(object_id, var) for var in variables}
+                for object_id, variables in self._subscriptions.items()}
+
+    def getLastStepVehicleNumber(self, object_id):
+        return self._value(object_id, LAST_STEP_VEHICLE_NUMBER)
+
+
+class _Lane(_Domain):
+    def _value(self, lane, var):
+        return int(round(self._sim.ctm._lane_vehicles(lane)[0]))
+
+    def getLength(self, lane):
+        return EDGES[lane.split("_")[0]][0]
+
+
+class _Edge(_Domain):
+    def _value(self, edge, var):
+        ctm = self._sim.ctm
+        if var == VAR_WAITING_TIME:
+            i = list(EDGES).index(edge)
+            return float(round(ctm.halted[0, i] * ctm.mean_wait[0, i]))
+        return int(round(ctm._edge_vehicles(edge)[0]))
+
+    def getWaitingTime(self, edge):
+        return self._value(edge, VAR_WAITING_TIME)
+
+
+class _LaneArea(_Domain):
+    def _value(self, detector, var):
+        seen, time_loss = self._sim.detector_totals[detector[len("e2_"):]]
+        if var == VAR_INTERVAL_NUMBER:
+            return seen
+        return time_loss / seen
+
+
+class _Simulation:
+    def __init__(self, sim):
+        self._sim = sim
+
+    def getTime(self):
+        return self._sim.time
+
+    def saveState(self, path):
+        self._sim.saved[path] = self._sim.snapshot()
+
+    def loadState(self, path):
+        self._sim.restore(self._sim.saved[path])
+
+
+class _TrafficLight:
+    def __init__(self, sim):
+        self._sim = sim
+
+    def setPhaseDuration(self, tls_id, duration):
+        self._sim.ctm.phase_remaining[:] = duration
+
+
+class _Vehicle:
+    def __init__(self, sim):
+        self._sim = sim
+
+    def add(self, vehicle_id, routeID, typeID="DEFAULT_VEHTYPE", depart="now", departLane="first", **kwargs):
+        if vehicle_id in self._sim.vehicle_ids:
+            raise TraCIException(f"The vehicle '{vehicle_id}' to add already exists.")
+        self._sim.vehicle_ids.add(vehicle_id)
+        self._sim.ctm.entry_queue[0, 0] += 1  # Dynamic vehicles enter at the start of E5
+
+    def setLaneChangeMode(self, vehicle_id, mode):
+        if vehicle_id not in self._sim.vehicle_ids:
+            raise TraCIException(f"Vehicle '{vehicle_id}' is not known.")
+
+
+class FakeTraci:
+    """Module-like object; pass an instance as SumoEnvironment(traci_module=FakeTraci())."""
+
+    TraCIException = TraCIException
+    FatalTraCIError = FatalTraCIError
+
+    def __init__(self):
+        self.ctm = None
+        self.saved = {}
+        self.lane = _Lane(self)
+        self.edge = _Edge(self)
+        self.lanearea = _LaneArea(self)
+        self.simulation = _Simulation(self)
+        self.trafficlight = _TrafficLight(self)
+        self.vehicle = _Vehicle(self)
+
+    def start(self, cmd, label=None, **kwargs):
+        if self.ctm is not None:
+            raise TraCIException("Connection 'default' is already active.")
+        self.ctm = CellTransmissionEnvironment()
+        self.time = 0.0
+        self.vehicle_ids = set()
+        # lane -> (vehicles seen, time loss); seen starts at 1 so the mean time loss is always defined
+        self.detector_totals = {lane: (1.0, 0.0) for lane in ("E5_0", "E6_0", "E6_1", "E8_0", "E9_0")}
+
+    def close(self):
+        if self.ctm is None:
+            raise FatalTraCIError("Not connected.")
+        self.ctm = None
+
+    def simulationStep(self, step=0.0):
+        seconds = max(1, int(round(step - self.time))) if step else 1
+        window = self.ctm.macro_step(seconds)
+        self.time += seconds
+        # Every detector sees the exiting vehicles split over the two E6 lanes and an even share of the delay
+        for lane, (seen, time_loss) in self.detector_totals.items():
+            self.detector_totals[lane] = (seen + window.vehicles_passed[0] / 2,
+                                          time_loss + window.delay[0] / len(self.detector_totals))
+
+    def snapshot(self):
+        return copy.deepcopy((self.ctm, self.time, self.vehicle_ids, self.detector_totals))
+
+    def restore(self, state):
+        self.ctm, self.time, self.vehicle_ids, self.detector_totals = copy.deepcopy(state)
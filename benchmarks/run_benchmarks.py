@@ -0,0 +1,182 @@
+"""
+Reproducible throughput benchmarks for the environment, the agent and the training loop.
+
+By default the environment runs against benchmarks/fake_traci.py, a deterministic stand-in for
+traci, so the suite works without SUMO. Results are written as JSON and can be compared against a
+stored baseline; any metric worse than its threshold fails the run with exit code 1.
+
+Usage:
+    python benchmarks/run_benchmarks.py [--output results.json] [--baseline benchmarks/baseline.json]
+                                        [--tolerance 0.25] [--backend fake|sumo|libsumo]
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from DynamicFlowSumoEnvironment import DynamicFlowSumoEnvironment
+from Instrumentation import Profiler
+from ReplayBuffer import ReplayBuffer
+from fake_traci import FakeTraci
+
+# Whether a larger value of each metric is better; used for the regression check
+HIGHER_IS_BETTER = {
+    "env_step_latency_ms": False,
+    "env_step_latency_p95_ms": False,
+    "traci_calls_per_step": False,
+    "act_latency_us": False,
+    "replay_updates_per_s": True,
+    "bytes_per_transition": False,
+    "episode_wall_time_s": False,
+}
+
+
+def make_env(backend, profiler=None):
+    kwargs = {"demand_seed": 0, "profiler": profiler}
+    if backend == "fake":
+        kwargs["traci_module"] = FakeTraci()
+    else:
+        kwargs["backend"] = backend
+        kwargs["sumo_args"] = ["--no-step-log", "--no-warnings", "--seed", "0"]
+    return DynamicFlowSumoEnvironment(os.path.join(ROOT, "ProjectFinal.sumocfg"), "J12", **kwargs)
+
+
+def bench_env(backend, steps):
+    """Step latency and TraCI calls per step with a fixed action sequence."""
+    profiler = Profiler()
+    env = make_env(backend, profiler)
+    env.reset()
+    calls_before = profiler.counters.get("traci_calls", 0)
+    latencies = []
+    for step in range(steps):
+        start = time.perf_counter()
+        env.step(step % env.action_size, step_count=step, max_steps=steps)
+        latencies.append(time.perf_counter() - start)
+    calls = profiler.counters.get("traci_calls", 0) - calls_before
+    env.close()
+    latencies = np.array(latencies) * 1000.0
+    return {
+        "env_step_latency_ms": float(latencies.mean()),
+        "env_step_latency_p95_ms": float(np.percentile(latencies, 95)),
+        "traci_calls_per_step": calls / steps,
+    }
+
+
+def bench_agent(replays, acts):
+    """act latency, batched replay throughput and replay memory footprint."""
+    from DQNAgent import DQNAgent
+
+    agent = DQNAgent(state_size=3, action_size=5)
+    rng = np.random.default_rng(0)
+    for _ in range(2000):
+        agent.remember(rng.random((1, 3)), int(rng.integers(5)), float(rng.normal()), rng.random((1, 3)), False)
+
+    state = rng.random((1, 3))
+    agent.act(state)
+    start = time.perf_counter()
+    for _ in range(acts):
+        agent.act(state)
+    act_latency = (time.perf_counter() - start) / acts
+
+    agent.replay(64)  # Trace the Keras functions once
+    start = time.perf_counter()
+    for _ in range(replays):
+        agent.replay(64)
+    replay_rate = replays / (time.perf_counter() - start)
+
+    buffer = ReplayBuffer(100000, 3)
+    return {
+        "act_latency_us": act_latency * 1e6,
+        "replay_updates_per_s": replay_rate,
+        "bytes_per_transition": buffer.nbytes() / buffer.capacity,
+    }
+
+
+def bench_episode(backend, steps, batch_size=64):
+    """Wall time of one training episode: act, step, remember and replay every step, as the learner would."""
+    from DQNAgent import DQNAgent
+
+    env = make_env(backend)
+    agent = DQNAgent(state_size=env.state_size, action_size=env.action_size)
+    np.random.seed(0)
+    start = time.perf_counter()
+    state = np.reshape(env.reset(), [1, env.state_size])
+    for step in range(steps):
+        action = agent.act(state)
+        next_state, reward, done = env.step(action, step_count=step, max_steps=steps)
+        next_state = np.reshape(next_state, [1, env.state_size])
+        agent.remember(state, action, reward, next_state, done)
+        state = next_state
+        if len(agent.memory) > batch_size:
+            agent.replay(batch_size)
+    elapsed = time.perf_counter() - start
+    env.close()
+    return {"episode_wall_time_s": elapsed}
+
+
+def compare(results, baseline, tolerance):
+    """:return: List of (metric, baseline, current) that regressed by more than tolerance."""
+    regressions = []
+    for metric, higher_is_better in HIGHER_IS_BETTER.items():
+        if metric not in baseline["metrics"] or metric not in results["metrics"]:
+            continue
+        old, new = baseline["metrics"][metric], results["metrics"][metric]
+        limit = baseline.get("thresholds", {}).get(metric, tolerance)
+        worse = old * (1 - limit) > new if higher_is_better else new > old * (1 + limit)
+        if worse:
+            regressions.append((metric, old, new))
+    return regressions
+
+
+def run_suite(backend="fake", env_steps=100, episode_steps=100, replays=50, acts=2000):
+    """Run every benchmark. :return: Results dict with the platform and the metrics."""
+    metrics = {}
+    metrics.update(bench_env(backend, env_steps))
+    metrics.update(bench_agent(replays, acts))
+    metrics.update(bench_episode(backend, episode_steps))
+    return {
+        "backend": backend,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "metrics": metrics,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--backend", default="fake", choices=["fake", "sumo", "libsumo"])
+    parser.add_argument("--env-steps", type=int, default=100)
+    parser.add_argument("--episode-steps", type=int, default=100)
+    parser.add_argument("--replays", type=int, default=50)
+    parser.add_argument("--acts", type=int, default=2000)
+    parser.add_argument("--output", help="Write the results JSON here")
+    parser.add_argument("--baseline", help="Baseline JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="Allowed relative regression for metrics without their own threshold")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    results = run_suite(args.backend, args.env_steps, args.episode_steps, args.replays, args.acts)
+    for name, value in results["metrics"].items():
+        print(f"{name:<26} {value:>12.3f}")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        for metric, old, new in regressions:
+            print(f"REGRESSION {metric}: {old:.3f} -> {new:.3f}")
+        sys.exit(1 if regressions else 0)
@@ -0,0 +1,76 @@
+"""
+Compare state and reward traces of CellTransmissionEnvironment against SUMO runs.
+
+Both simulators receive the same seeded random action sequence; the script reports per-signal
+means, mean absolute error and correlation, and optionally saves the traces as JSON.
+
+Usage: python calibrate_surrogate.py [--backend libsumo] [--steps 40] [--seed 0] [--output traces.json]
+"""
+import argparse
+import contextlib
+import io
+import json
+
+import numpy as np
+
+from CellTransmissionEnvironment import CellTransmissionEnvironment
+from SumoEnvironment import ACTIONS, SumoEnvironment
+
+SIGNALS = ["traffic_density", "waiting_time", "queue_length", "reward"]
+
+
+def rollout(env, actions):
+    """Run the action sequence and return a (steps, 4) array of state features and rewards."""
+    trace = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        env.reset()
+        for step, action in enumerate(actions):
+            state, reward, _ = env.step(int(action), step_count=step, max_steps=len(actions))
+            trace.append(list(np.ravel(state)) + [float(reward)])
+    env.close()
+    return np.array(trace)
+
+
+def compare(sumo_trace, surrogate_trace):
+    report = {}
+    for i, name in enumerate(SIGNALS):
+        a, b = sumo_trace[:, i], surrogate_trace[:, i]
+        correlation = np.corrcoef(a, b)[0, 1] if a.std() > 0 and b.std() > 0 else float("nan")
+        report[name] = {
+            "sumo_mean": float(a.mean()),
+            "surrogate_mean": float(b.mean()),
+            "mae": float(np.abs(a - b).mean()),
+            "correlation": float(correlation),
+        }
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sumo-cfg", default="ProjectFinal.sumocfg")
+    parser.add_argument("--backend", default="libsumo")
+    parser.add_argument("--steps", type=int, default=40)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--mainline-demand", type=float, default=0.66)
+    parser.add_argument("--ramp-demand", type=float, default=0.32)
+    parser.add_argument("--lane-capacity", type=float, default=0.35)
+    parser.add_argument("--output", help="Optional JSON file for the traces and the report")
+    args = parser.parse_args()
+
+    actions = np.random.default_rng(args.seed).integers(len(ACTIONS), size=args.steps)
+    sumo = SumoEnvironment(args.sumo_cfg, "J12", backend=args.backend,
+                           sumo_args=["--no-step-log", "--no-warnings", "--seed", str(args.seed)])
+    surrogate = CellTransmissionEnvironment(mainline_demand=args.mainline_demand, ramp_demand=args.ramp_demand,
+                                            lane_capacity=args.lane_capacity)
+    sumo_trace = rollout(sumo, actions)
+    surrogate_trace = rollout(surrogate, actions)
+    report = compare(sumo_trace, surrogate_trace)
+
+    print(f"{'signal':<16} {'sumo mean':>10} {'ctm mean':>10} {'MAE':>10} {'corr':>6}")
+    for name, row in report.items():
+        print(f"{name:<16} {row['sumo_mean']:>10.3f} {row['surrogate_mean']:>10.3f} {row['mae']:>10.3f} "
+              f"{row['correlation']:>6.2f}")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"actions": actions.tolist(), "signals": SIGNALS, "sumo": sumo_trace.tolist(),
+                       "surrogate": surrogate_trace.tolist(), "report": report}, f)
@@ -0,0 +1,204 @@
+"""
+Greedy evaluation of a saved DQN model against the five fixed-time plans on identical traffic.
+
+Every policy (the model's greedy policy and "fixed_<i>", which always picks action i) runs once on
+each seeded demand scenario for the same simulated duration, however many action windows that
+takes. A scenario fixes the injected demand (demand_seed, keyed by simulation time) and SUMO's own
+--seed, so all policies face the same arriving vehicles; the traffic still differs through their
+signal plans and through SUMO's random draws, whose order depends on them. Rollouts are spread
+over worker processes that each keep one environment; a Keras model is evaluated with the NumPy
+forward pass and a lookup policy written by export_policy.py (.rmlp) with LookupPolicy, so workers
+never import TensorFlow. The report gives, per policy, the mean and 95% confidence interval over
+scenarios of waiting time, queue, throughput, delay and reward, plus the paired difference between
+the model and each fixed plan.
+
+Usage:
+    python evaluate.py [--model results/dqn_model.h5] [--scenarios 8] [--horizon 1500] [--workers 4]
+                       [--env sumo|surrogate] [--backend libsumo] [--output results/evaluation.json]
+"""
+import argparse
+import json
+import multiprocessing as mp
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from NumpyQNetwork import NumpyQNetwork
+from SumoEnvironment import ACTIONS
+
+# Per-episode metrics over the simulated horizon: waiting time, queue and reward are averaged over time
+# (each action window weighted by its duration), throughput and delay are per simulated hour
+METRICS = ["waiting_time", "queue_length", "max_queue", "throughput", "delay", "reward"]
+
+# Two-sided 95% Student t quantiles by degrees of freedom; larger samples use the normal quantile
+T_95 = {1: 12.706, 2: 4.303, 3: 3.182, 4: 2.776, 5: 2.571, 6: 2.447, 7: 2.365, 8: 2.306, 9: 2.262, 10: 2.228,
+        12: 2.179, 15: 2.131, 20: 2.086, 25: 2.060, 30: 2.042, 40: 2.021, 60: 2.000, 120: 1.980}
+
+_env = None  # Environment owned by the current worker process
+_policy = None  # Greedy action function of the model in the current worker process
+
+
+def t_quantile(df):
+    """95% two-sided t quantile, rounding df down to the nearest tabulated value."""
+    if df <= 0:
+        return float("nan")
+    tabulated = [d for d in T_95 if d <= df]
+    return T_95[max(tabulated)] if df <= 120 else 1.960
+
+
+def confidence_interval(values):
+    """:return: Dict of mean, std, n and the 95% CI half-width of the mean."""
+    values = np.asarray(values, dtype=np.float64)
+    n = len(values)
+    std = float(values.std(ddof=1)) if n > 1 else 0.0
+    half_width = t_quantile(n - 1) * std / np.sqrt(n) if n > 1 else float("nan")
+    return {"mean": float(values.mean()), "std": std, "n": n, "ci95": float(half_width)}
+
+
+def _init_worker(env_name, sumo_cfg_file, backend, weights, demand_noise, policy_file=None):
+    """Build this worker's environment and model policy once; rollouts reuse them."""
+    global _env, _policy
+    if weights is not None:
+        network = NumpyQNetwork(weights)
+        _policy = lambda state: int(np.argmax(network.predict(state)[0]))
+    elif policy_file is not None:
+        from LookupPolicy import LookupPolicy
+        lookup = LookupPolicy(policy_file)
+        _policy = lambda state: lookup.act(state[0])
+    if env_name == "surrogate":
+        from CellTransmissionEnvironment import CellTransmissionEnvironment
+        _env = CellTransmissionEnvironment(demand_noise=demand_noise)
+    else:
+        from DynamicFlowSumoEnvironment import DynamicFlowSumoEnvironment
+        _env = DynamicFlowSumoEnvironment(sumo_cfg_file, "J12", backend=backend,
+                                          sumo_args=["--no-step-log", "--no-warnings"])
+        _env.base_sumo_args = list(_env.sumo_args)
+
+
+def _seed_scenario(env, seed):
+    """Make the next reset replay scenario `seed`."""
+    if hasattr(env, "demand_seed"):
+        env.demand_seed = seed
+        env.episode = 0  # Demand of episode 0 of (seed, 0)
+        env.sumo_args = env.base_sumo_args + ["--seed", str(seed)]
+    else:
+        env.rng = np.random.default_rng(seed)
+
+
+def _sim_time(env):
+    """Simulated seconds of SumoEnvironment (sim_time) or of the single surrogate ramp (time)."""
+    return env.sim_time if hasattr(env, "sim_time") else float(env.time[0])
+
+
+def rollout(policy, seed, horizon):
+    """
+    Run one episode of a policy on scenario `seed` in this worker until `horizon` simulated seconds
+    have passed. The last action window may end past the horizon, so the metrics are normalised by the
+    simulated time actually covered.
+    :return: (policy, seed, metrics dict).
+    """
+    env = _env
+    _seed_scenario(env, seed)
+    state = np.reshape(env.reset(), [1, -1])
+    begin = _sim_time(env)
+    totals = dict.fromkeys(METRICS, 0.0)
+    step = 0
+    while _sim_time(env) - begin < horizon:
+        if policy == "dqn":
+            action = _policy(state)
+        else:
+            action = int(policy.split("_")[1])
+        next_state, reward, done = env.step(action, step_count=step, max_steps=float("inf"))
+        step += 1
+        state = np.reshape(next_state, [1, -1])
+        duration = float(np.max(env.window.duration))
+        totals["waiting_time"] += float(state[0, 1]) * duration
+        totals["queue_length"] += float(state[0, 2]) * duration
+        totals["max_queue"] = max(totals["max_queue"], float(np.max(env.window.max_queue)))
+        totals["throughput"] += float(np.sum(env.window.vehicles_passed))
+        totals["delay"] += float(np.sum(env.window.delay))
+        totals["reward"] += float(np.sum(reward)) * duration
+    elapsed = _sim_time(env) - begin
+    for metric in ("waiting_time", "queue_length", "reward"):
+        totals[metric] /= elapsed
+    for metric in ("throughput", "delay"):
+        totals[metric] *= 3600.0 / elapsed
+    return policy, seed, totals
+
+
+def evaluate(model_path="results/dqn_model.h5", scenarios=8, horizon=1500.0, workers=4, env_name="sumo",
+             sumo_cfg_file="ProjectFinal.sumocfg", backend="libsumo", baselines=True, first_seed=1000,
+             demand_noise=0.1):
+    """
+    Evaluate the model's greedy policy and (optionally) the fixed plans on the same scenarios.
+    :param model_path: Keras .h5 model, or a .rmlp lookup policy written by export_policy.py.
+    :param horizon: Simulated seconds every policy runs on each scenario.
+    :param first_seed: Scenario i uses seed first_seed + i, kept apart from training seeds.
+    :return: Report dict with per-policy statistics, paired differences and the raw episodes.
+    """
+    lookup = bool(model_path) and model_path.endswith(".rmlp")
+    weights = NumpyQNetwork.from_h5(model_path).layers if model_path and not lookup else None
+    flat_weights = [array for layer in weights for array in layer] if weights else None
+    policies = (["dqn"] if model_path else []) + ([f"fixed_{i}" for i in range(len(ACTIONS))] if baselines else [])
+    seeds = [first_seed + i for i in range(scenarios)]
+    jobs = [(policy, seed) for seed in seeds for policy in policies]
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers, mp_context=mp.get_context("spawn"), initializer=_init_worker,
+                             initargs=(env_name, sumo_cfg_file, backend, flat_weights, demand_noise,
+                                       model_path if lookup else None)) as pool:
+        episodes = list(pool.map(rollout, *zip(*jobs), [horizon] * len(jobs)))
+    elapsed = time.perf_counter() - start
+
+    results = {policy: {seed: metrics for p, seed, metrics in episodes if p == policy} for policy in policies}
+    report = {
+        "model": model_path, "env": env_name, "scenarios": seeds, "horizon": horizon,
+        "wall_time_s": elapsed,
+        "policies": {policy: {metric: confidence_interval([results[policy][s][metric] for s in seeds])
+                              for metric in METRICS} for policy in policies},
+        "episodes": {policy: {str(seed): metrics for seed, metrics in results[policy].items()} for policy in policies},
+    }
+    if "dqn" in policies:
+        # Paired over scenarios: the same traffic removes most of the between-scenario variance
+        report["dqn_minus_baseline"] = {
+            policy: {metric: confidence_interval([results["dqn"][s][metric] - results[policy][s][metric]
+                                                  for s in seeds]) for metric in METRICS}
+            for policy in policies if policy != "dqn"
+        }
+    return report
+
+
+def format_report(report):
+    lines = [f"{len(report['scenarios'])} scenarios x {report['horizon']:.0f} simulated s on {report['env']} "
+             f"in {report['wall_time_s']:.1f} s (mean ± 95% CI)"]
+    lines.append(f"{'policy':<10}" + "".join(f"{metric:>24}" for metric in METRICS))
+    for policy, stats in report["policies"].items():
+        lines.append(f"{policy:<10}" + "".join(f"{stats[m]['mean']:>14.2f} ± {stats[m]['ci95']:<7.2f}" for m in METRICS))
+    for policy, stats in report.get("dqn_minus_baseline", {}).items():
+        lines.append(f"{'dqn-' + policy:<10}" + "".join(f"{stats[m]['mean']:>14.2f} ± {stats[m]['ci95']:<7.2f}"
+                                                        for m in METRICS))
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Evaluate a saved model against the fixed-time plans.")
+    parser.add_argument("--model", default="results/dqn_model.h5", help="Keras .h5 model or .rmlp lookup policy to evaluate")
+    parser.add_argument("--scenarios", type=int, default=8, help="Number of seeded demand scenarios")
+    parser.add_argument("--first-seed", type=int, default=1000, help="Seed of the first scenario")
+    parser.add_argument("--horizon", type=float, default=1500.0, help="Simulated seconds per episode")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--env", default="sumo", choices=["sumo", "surrogate"])
+    parser.add_argument("--backend", default="libsumo", choices=["sumo", "libsumo"])
+    parser.add_argument("--sumo-cfg", default="ProjectFinal.sumocfg")
+    parser.add_argument("--demand-noise", type=float, default=0.1, help="Demand noise of the surrogate scenarios")
+    parser.add_argument("--no-baselines", action="store_true", help="Only evaluate the model")
+    parser.add_argument("--output", help="Write the full report as JSON")
+    args = parser.parse_args()
+
+    report = evaluate(args.model, args.scenarios, args.horizon, args.workers, args.env, args.sumo_cfg, args.backend,
+                      not args.no_baselines, args.first_seed, args.demand_noise)
+    print(format_report(report))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
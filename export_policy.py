@@ -0,0 +1,196 @@
+"""
+Distill a trained Q-network into a quantized lookup table for the LookupPolicy runtime.
+
+The state space (traffic density, waiting time, queue length) is cut into a grid with a
+configurable number of bins per feature, linear or log1p spaced; every cell stores the network's
+argmax action at its centre. Grid ranges come from states visited by the network's own policy
+(surrogate rollouts with some exploration, or a recorded TransitionDataset), and the agreement
+with the network and the Q-value given up on disagreement are measured on a separate set of
+held-out states.
+
+Usage:
+    python export_policy.py [--model results/dqn_model.h5] [--output results/policy.rmlp]
+                            [--bins 32 32 32] [--scales linear log1p log1p] [--dataset DIR]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+from LookupPolicy import AXIS, HEADER, LINEAR, LOG1P, MAGIC, VERSION, LookupPolicy
+from NumpyQNetwork import NumpyQNetwork
+
+SCALES = {"linear": LINEAR, "log1p": LOG1P}
+
+
+def collect_states(network, num_states, seed=0, num_envs=64, epsilon=0.2):
+    """States visited by the network's epsilon-greedy policy in the cell-transmission surrogate."""
+    from CellTransmissionEnvironment import CellTransmissionEnvironment
+
+    rng = np.random.default_rng(seed)
+    env = CellTransmissionEnvironment(num_envs=num_envs, demand_noise=0.2, seed=seed)
+    states = [env.reset()]
+    step = 0
+    while len(states) * num_envs < num_states:
+        actions = np.argmax(network.predict_batch(states[-1]), axis=1)
+        explore = rng.random(num_envs) < epsilon
+        actions[explore] = rng.integers(env.action_size, size=int(explore.sum()))
+        state, _, _ = env.step(actions, step_count=step)
+        states.append(state)
+        step += 1
+    return np.concatenate(states)[:num_states]
+
+
+def dataset_states(path, num_states, seed=0):
+    """A random sample without replacement of num_states states drawn from all shards of a TransitionDataset."""
+    from TransitionDataset import TransitionDataset
+
+    dataset = TransitionDataset(path)
+    if len(dataset) < num_states:
+        raise ValueError(f"Dataset {path} holds {len(dataset)} states, fewer than the {num_states} requested "
+                         f"for fitting and evaluation")
+    rng = np.random.default_rng(seed)
+    rows = rng.choice(len(dataset), size=num_states, replace=False)
+    ends = np.cumsum(dataset.shard_sizes)
+    shard_of = np.searchsorted(ends, rows, side="right")
+    states = np.empty((num_states, dataset.state_size), dtype=np.float32)
+    for s, shard in enumerate(dataset.shards):
+        picked = np.flatnonzero(shard_of == s)
+        # Sorted row indices make each gather a forward scan through the mapped file
+        order = np.argsort(rows[picked])
+        local = rows[picked][order] - (ends[s] - dataset.shard_sizes[s])
+        states[picked[order]] = shard["states"][local]
+    return states
+
+
+def _transform(values, scale):
+    return np.log1p(np.maximum(values, 0.0)) if scale == LOG1P else values
+
+
+def fit_axes(states, bins, scales, percentile=99.5):
+    """(bins, scale, low, high) per feature, covering the visited states up to the given percentile."""
+    axes = []
+    for i, (n, scale) in enumerate(zip(bins, scales)):
+        values = _transform(states[:, i], scale)
+        low, high = float(values.min()), float(np.percentile(values, percentile))
+        axes.append((int(n), scale, low, high if high > low else low + 1.0))
+    return axes
+
+
+def build_table(network, axes, chunk=65536):
+    """Argmax action of the network at the centre of every grid cell, as a C-ordered uint8 array."""
+    centres = []
+    for bins, scale, low, high in axes:
+        centre = low + (np.arange(bins) + 0.5) * (high - low) / bins
+        centres.append(np.expm1(centre) if scale == LOG1P else centre)
+    grid = np.stack(np.meshgrid(*centres, indexing="ij"), axis=-1).reshape(-1, len(axes))
+    table = np.empty(len(grid), dtype=np.uint8)
+    for start in range(0, len(grid), chunk):
+        table[start:start + chunk] = np.argmax(network.predict_batch(grid[start:start + chunk]), axis=1)
+    return table
+
+
+def lookup(axes, table, states):
+    """Vectorized equivalent of LookupPolicy.act over many states."""
+    index = np.zeros(len(states), dtype=np.int64)
+    for i, (bins, scale, low, high) in enumerate(axes):
+        position = np.floor((_transform(states[:, i], scale) - low) / (high - low) * bins).astype(np.int64)
+        index = index * bins + np.clip(position, 0, bins - 1)
+    return table[index]
+
+
+def write_policy(path, axes, table):
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, len(axes)))
+        for bins, scale, low, high in axes:
+            f.write(AXIS.pack(bins, scale, low, high))
+        f.write(table.tobytes())
+
+
+def agreement(network, axes, table, states):
+    """Share of states where the table picks the network's action, and the mean Q-value lost where it does not."""
+    q_values = network.predict_batch(states)
+    chosen = lookup(axes, table, states)
+    best = np.argmax(q_values, axis=1)
+    regret = q_values[np.arange(len(states)), best] - q_values[np.arange(len(states)), chosen]
+    return {"agreement": float(np.mean(chosen == best)), "mean_q_regret": float(regret.mean()),
+            "max_q_regret": float(regret.max())}
+
+
+def runtime_timings(path, states, repeats=20000):
+    """Per-call latency of LookupPolicy.act and the cold start of a fresh interpreter loading the policy."""
+    policy = LookupPolicy(path)
+    rows = [tuple(map(float, row)) for row in states[:repeats]]
+    start = time.perf_counter()
+    for row in rows:
+        policy.act(*row)
+    latency = (time.perf_counter() - start) / len(rows)
+    policy.close()
+
+    root = os.path.dirname(os.path.abspath(__file__))
+    code = (f"import sys, time; t = time.perf_counter(); sys.path.insert(0, {root!r}); "
+            f"from LookupPolicy import LookupPolicy; LookupPolicy({os.path.abspath(path)!r}).act(0.0, 0.0, 0.0); "
+            f"print(time.perf_counter() - t)")
+    start = time.perf_counter()
+    load = float(subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout)
+    return {"act_latency_us": latency * 1e6, "load_ms": load * 1000.0,
+            "process_start_ms": (time.perf_counter() - start) * 1000.0}
+
+
+def export(model_path, output, bins=(32, 32, 32), scales=("linear", "log1p", "log1p"), dataset=None,
+           fit_states=200000, eval_states=50000, seed=0):
+    """
+    Distill the model into a lookup table at `output`.
+    :return: Report dict with grid, agreement and runtime measurements.
+    """
+    network = NumpyQNetwork.from_h5(model_path)
+    scale_ids = [SCALES[scale] for scale in scales]
+    if dataset:
+        states = dataset_states(dataset, fit_states + eval_states, seed)
+        fit, held_out = states[:fit_states], states[fit_states:]
+    else:
+        fit = collect_states(network, fit_states, seed)
+        held_out = collect_states(network, eval_states, seed + 1)
+    axes = fit_axes(fit, bins, scale_ids)
+    table = build_table(network, axes)
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    write_policy(output, axes, table)
+
+    # The numpy lookup used for agreement must match the runtime exactly
+    policy = LookupPolicy(output)
+    sample = held_out[:1000]
+    mismatches = sum(policy.act(*map(float, row)) != action for row, action in zip(sample, lookup(axes, table, sample)))
+    policy.close()
+    if mismatches:
+        raise RuntimeError(f"LookupPolicy read back from {output} disagrees with the exported table on "
+                           f"{mismatches} of {len(sample)} held-out states")
+
+    return {
+        "model": model_path, "output": output, "bytes": os.path.getsize(output),
+        "axes": [{"bins": b, "scale": scales[i], "low": low, "high": high} for i, (b, _, low, high) in enumerate(axes)],
+        "held_out": agreement(network, axes, table, held_out),
+        "fit": agreement(network, axes, table, fit),
+        **runtime_timings(output, held_out),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Distill a Q-network into a lookup-table policy.")
+    parser.add_argument("--model", default="results/dqn_model.h5")
+    parser.add_argument("--output", default="results/policy.rmlp")
+    parser.add_argument("--bins", type=int, nargs=3, default=[32, 32, 32],
+                        help="Bins for traffic density, waiting time and queue length")
+    parser.add_argument("--scales", nargs=3, default=["linear", "log1p", "log1p"], choices=list(SCALES))
+    parser.add_argument("--dataset", help="Take the states from a recorded TransitionDataset instead of the surrogate")
+    parser.add_argument("--fit-states", type=int, default=200000)
+    parser.add_argument("--eval-states", type=int, default=50000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    report = export(args.model, args.output, args.bins, args.scales, args.dataset, args.fit_states,
+                    args.eval_states, args.seed)
+    print(json.dumps(report, indent=2))
@@ -1,84 +1,209 @@
-import matplotlib.pyplot as plt
-from SumoEnvironment import SumoEnvironment
-from DynamicFlowSumoEnvironment import DynamicFlowSumoEnvironment
-from DQNAgent import DQNAgent
-import numpy as np
-import threading
-
-env = DynamicFlowSumoEnvironment(sumo_cfg_file="ProjectFinal.sumocfg", traffic_light_id="J12")
-agent = DQNAgent(state_size=env.state_size, action_size=env.action_size)
-
-# Training parameters
-episodes = 1
-batch_size = 64
-max_steps = 100  # Max steps per episode
-
-# Track metrics across all episodes
-episode_rewards = []
-episode_lengths = []
-
-# Replay threading
-replay_thread = None
-
-def replay_in_thread():
-    """Run the replay function in a separate thread."""
-    global replay_thread
-    if replay_thread is None or not replay_thread.is_alive():
-        replay_thread = threading.Thread(target=lambda: agent.replay(batch_size))
-        replay_thread.start()
-
-for episode in range(episodes):
-    print(f"\nStarting Episode {episode + 1}/{episodes}")
-    
-    # Reset environment for the episode
-    state = env.reset()
-    state = np.reshape(state, [1, env.state_size])
-    done = False
-    total_reward = 0
-    step_count = 0
-
-    while not done:
-        # Dynamically adjust traffic flow
-        env.adjust_traffic_flow()
-
-        # Get Q-values for the current state and log them
-        q_values = agent.model.predict(state)
-        print(f"Step {step_count + 1}, Q-values: {q_values}")
-
-        # Select an action using the agent
-        action = agent.act(state)
-        
-        # Perform the action and step the environment
-        next_state, reward, done = env.step(action, step_count=step_count, max_steps=max_steps)
-        next_state = np.reshape(next_state, [1, env.state_size])
-
-        # Store experience in memory
-        agent.remember(state, action, reward, next_state, done)
-
-        # Update state and metrics
-        state = next_state
-        total_reward += reward
-        step_count += 1
-
-        # Trigger replay in a thread if memory size is sufficient
-        if len(agent.memory) > batch_size:
-            replay_in_thread()
-
-    # Log episode metrics
-    episode_rewards.append(total_reward)
-    episode_lengths.append(step_count)
-    print(f"Episode {episode + 1}/{episodes}, Total Reward: {total_reward}, Steps Taken: {step_count}")
-
-# Wait for any ongoing replay to finish
-if replay_thread is not None:
-    replay_thread.join()
-
-# After training, plot metrics
-env.plot_metrics()
-
-# Save the trained model
-agent.model.save("results/dqn_model.h5")
-print("Training complete. Model saved to results/dqn_model.h5.")
-
-# Close the environment
-env.close()
+"""
+Command-line entry point: train, evaluate, export, plot and bench.
+
+Settings come from config.json next to this file, one section per command. --config merges another
+JSON file over it recursively (it only needs the values that change, at any depth) and --set
+overrides single values, addressed by a dotted path such as train.env_kwargs.backend. Each
+command imports what it needs inside its handler, so `plot` never loads TensorFlow and evaluating an
+exported lookup policy never loads Keras. --dry-run prints the resolved settings and the heavy
+modules the command loaded without running it; `bench` times it in fresh interpreters to track
+cold start.
+
+Usage:
+    python main.py train [--config my_config.json] [--set train.episodes=5] [--set train.env_kwargs.backend=libsumo]
+    python main.py evaluate --set evaluate.model=results/policy.rmlp --set evaluate.env=surrogate
+    python main.py {export,plot,bench} [--dry-run]
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_CONFIG = os.path.join(ROOT, "config.json")
+
+# Dependencies whose import dominates start-up; --dry-run reports which of them a command loaded
+HEAVY_MODULES = ["tensorflow", "keras", "matplotlib", "h5py", "traci", "libsumo"]
+
+
+def merge(config, overrides, _path=()):
+    """
+    Merge overrides into config recursively, dict into dict. Sections and their settings must exist in
+    config.json; dicts below a setting (env_kwargs, agent_kwargs) are keyword arguments and take new keys.
+    """
+    for key, value in overrides.items():
+        path = _path + (key,)
+        if key not in config and len(path) == 1:
+            raise ValueError(f"Unknown config section {key!r}")
+        if key not in config and len(path) == 2:
+            raise ValueError(f"Unknown setting {'.'.join(path)!r}")
+        if len(path) == 1 and not isinstance(value, dict):
+            raise ValueError(f"Config section {key!r} must be an object, got {value!r}")
+        if isinstance(value, dict) and isinstance(config.get(key), dict):
+            merge(config[key], value, path)
+        else:
+            config[key] = value
+    return config
+
+
+def parse_override(text):
+    """
+    'section.key=value' -> {section: {key: value}}, with further dots nesting deeper
+    ('train.env_kwargs.backend=libsumo'); the value is parsed as JSON, else kept as a string.
+    """
+    name, equals, raw = text.partition("=")
+    keys = name.split(".")
+    if not equals or len(keys) < 2 or not all(keys):
+        raise argparse.ArgumentTypeError(f"Expected SECTION.KEY[.KEY...]=VALUE, got {text!r}")
+    try:
+        value = json.loads(raw)
+    except json.JSONDecodeError:
+        value = raw
+    for key in reversed(keys):
+        value = {key: value}
+    return value
+
+
+def load_config(path=None, overrides=()):
+    """:return: config.json, updated with the file at path and then with each override."""
+    with open(DEFAULT_CONFIG) as f:
+        config = json.load(f)
+    if path:
+        with open(path) as f:
+            merge(config, json.load(f))
+    for override in overrides:
+        merge(config, override)
+    return config
+
+
+def _train(options, dry_run=False):
+    from ActorLearner import run_actor_learner
+    from DynamicFlowSumoEnvironment import DynamicFlowSumoEnvironment
+    if dry_run:
+        return 0
+    # Actors step the environment and push transitions through a shared-memory queue; the learner
+    # trains continuously in its own process, broadcasts weights and saves the model at the end.
+    options = dict(options)
+    metrics = run_actor_learner(DynamicFlowSumoEnvironment, options.pop("env_kwargs"), **options)
+    logging.info("Transitions: %.0f, Updates: %.0f, %.1f transitions/s, %.1f updates/s", metrics["transitions"],
+                 metrics["updates"], metrics["transitions_per_s"], metrics["updates_per_s"])
+    return 0
+
+
+def _evaluate(options, dry_run=False):
+    from evaluate import evaluate, format_report
+    if dry_run:
+        return 0
+    report = evaluate(options["model"], options["scenarios"], options["horizon"], options["workers"], options["env"],
+                      options["sumo_cfg_file"], options["backend"], options["baselines"], options["first_seed"],
+                      options["demand_noise"])
+    print(format_report(report))
+    if options["output"]:
+        with open(options["output"], "w") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+def _export(options, dry_run=False):
+    from export_policy import export
+    if dry_run:
+        return 0
+    report = export(options["model"], options["output"], options["bins"], options["scales"], options["dataset"],
+                    options["fit_states"], options["eval_states"], options["seed"])
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+def _plot(options, dry_run=False):
+    from plot_metrics import plot_run, plot_runs
+    if dry_run:
+        return 0
+    runs = options["runs"]
+    paths = plot_run(runs[0], options["output"], options["max_points"])
+    if len(runs) > 1:
+        paths += plot_runs(runs, options["output"])
+    for path in paths:
+        print(path)
+    return 0
+
+
+def _bench(options, dry_run=False):
+    sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+    from run_benchmarks import compare, run_suite
+    if dry_run:
+        return 0
+    results = run_suite(options["backend"], options["env_steps"], options["episode_steps"], options["replays"],
+                        options["acts"])
+    if options["startup"]:
+        results["startup"] = startup_times()
+    for name, value in results["metrics"].items():
+        print(f"{name:<26} {value:>12.3f}")
+    for command, startup in results.get("startup", {}).items():
+        print(f"{'startup_' + command + '_ms':<26} {startup['wall_ms']:>12.3f}  {' '.join(startup['loaded'])}")
+    if options["output"]:
+        with open(options["output"], "w") as f:
+            json.dump(results, f, indent=2)
+
+    if options["baseline"]:
+        with open(options["baseline"]) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, options["tolerance"])
+        for metric, old, new in regressions:
+            print(f"REGRESSION {metric}: {old:.3f} -> {new:.3f}")
+        return 1 if regressions else 0
+    return 0
+
+
+COMMANDS = {"train": _train, "evaluate": _evaluate, "export": _export, "plot": _plot, "bench": _bench}
+
+
+def startup_times(commands=None, repeats=3):
+    """
+    Cold start of each command: wall time of `main.py <command> --dry-run` in a fresh interpreter.
+    :return: Dict of command -> {"wall_ms": fastest of the repeats, "loaded": heavy modules imported}.
+    """
+    import subprocess
+
+    times = {}
+    for command in commands or COMMANDS:
+        wall = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            output = subprocess.run([sys.executable, os.path.join(ROOT, "main.py"), command, "--dry-run"],
+                                    capture_output=True, text=True, check=True).stdout
+            wall.append((time.perf_counter() - start) * 1000.0)
+        times[command] = {"wall_ms": min(wall), "loaded": json.loads(output)["loaded"]}
+    return times
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Train, evaluate, export, plot and benchmark ramp-metering policies.")
+    parser.add_argument("command", choices=list(COMMANDS))
+    parser.add_argument("--config", help="JSON file merged over config.json")
+    parser.add_argument("--set", dest="overrides", action="append", default=[], type=parse_override,
+                        metavar="SECTION.KEY=VALUE",
+                        help="Override one setting, nested keys joined by dots; VALUE is JSON or a plain string")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="Print the resolved settings and loaded heavy modules without running the command")
+    parser.add_argument("--log-level", help="Defaults to INFO for train and WARNING otherwise; DEBUG also logs "
+                                            "every step, action and Q-values")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=args.log_level or ("INFO" if args.command == "train" else "WARNING"))
+
+    try:
+        config = load_config(args.config, args.overrides)
+    except ValueError as error:
+        parser.error(str(error))
+    options = config[args.command]
+    if args.dry_run:
+        COMMANDS[args.command](options, dry_run=True)
+        loaded = [name for name in HEAVY_MODULES if name in sys.modules]
+        print(json.dumps({"command": args.command, "options": options, "loaded": loaded}, indent=2))
+        return 0
+    return COMMANDS[args.command](options)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,163 @@
+"""
+Plot the per-step metrics logs written during training, offline and without a display.
+
+With one run directory the script draws the per-step plots (waiting time, reward, action
+distribution, actions over time, vehicles injected). With several it also aggregates the
+per-episode reward and waiting time across runs (mean with min/max band). Logs are read through
+memory maps in chunks, so they never have to fit in memory.
+
+Usage: python plot_metrics.py results/metrics/actor_0 [more run dirs ...] [--output results/plots]
+"""
+import argparse
+import os
+
+import numpy as np
+
+from MetricsLog import MetricsReader
+
+ACTION_COLORS = ['blue', 'orange', 'green', 'red', 'purple']  # One color for each action (0, 1, 2, 3, 4)
+
+
+def _pyplot():
+    """Import pyplot with the non-interactive Agg backend, so plotting never needs or blocks on a display."""
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    return plt
+
+
+def plot_run(run_dir, output_dir="results/plots", max_points=5000):
+    """
+    Draw the per-step plots of one run.
+    :param max_points: Long logs are averaged into this many buckets per line or bar plot.
+    :return: List of written image paths.
+    """
+    plt = _pyplot()
+    from matplotlib.patches import Patch
+
+    reader = MetricsReader(run_dir)
+    if len(reader) == 0:
+        return []
+    os.makedirs(output_dir, exist_ok=True)
+    labels = reader.metadata.get("action_labels", [str(i) for i in range(len(ACTION_COLORS))])
+    written = []
+
+    def save(name):
+        path = os.path.join(output_dir, name)
+        plt.savefig(path)
+        plt.close()
+        written.append(path)
+
+    # Plot waiting times
+    steps, waiting_times = reader.downsample("waiting_time", max_points)
+    plt.figure(figsize=(12, 6))
+    plt.bar(steps, waiting_times, width=max(1, steps[1] - steps[0]) if len(steps) > 1 else 0.8,
+            color='blue', alpha=0.7)
+    plt.xlabel("Time Step")
+    plt.ylabel("Waiting Time")
+    plt.title("Waiting Time per Step")
+    plt.grid()
+    save("waiting_time.png")
+
+    # Plot rewards
+    steps, rewards = reader.downsample("reward", max_points)
+    plt.figure(figsize=(12, 6))
+    plt.plot(steps, rewards, label="Reward", color='green')
+    plt.xlabel("Time Step")
+    plt.ylabel("Reward")
+    plt.title("Reward Progression")
+    plt.legend()
+    plt.grid()
+    save("rewards.png")
+
+    # Plot action distribution
+    action_counts = reader.value_counts("action", minlength=len(labels))
+    plt.figure(figsize=(12, 6))
+    plt.bar(range(len(action_counts)), action_counts, color='orange', alpha=0.7)
+    plt.xticks(ticks=range(len(labels)), labels=[f"{i}: {label}" for i, label in enumerate(labels)],
+               rotation=45, ha='right')
+    plt.xlabel("Action (with Durations)")
+    plt.ylabel("Frequency")
+    plt.title("Action Distribution")
+    plt.tight_layout()
+    plt.grid()
+    save("actions.png")
+
+    # Plot vehicles injected, cumulative within each episode
+    episodes, vehicles = reader.per_episode("vehicles_added")
+    plt.figure(figsize=(12, 6))
+    plt.plot(episodes, vehicles, marker='o', label="Vehicles Added per Episode", color='green')
+    plt.xlabel("Episode")
+    plt.ylabel("Number of Vehicles")
+    plt.title("Total Number of Vehicles Added per Episode")
+    plt.legend()
+    plt.grid()
+    save("vehicles_passed.png")
+
+    # Plot the actions taken over time; only the last max_points steps when the run is longer
+    start = max(0, len(reader) - max_points)
+    actions = np.asarray(reader.column("action")[start:])
+    plt.figure(figsize=(12, 6))
+    plt.bar(np.arange(start, start + len(actions)), actions,
+            color=np.array(ACTION_COLORS)[actions], alpha=0.8, edgecolor="black")
+    plt.xlabel("Time Step")
+    plt.ylabel("Action")
+    plt.title("Actions Taken Over Time")
+    plt.yticks(ticks=range(len(ACTION_COLORS)), labels=[f"Action {i}" for i in range(len(ACTION_COLORS))])
+    plt.grid(axis='y', linestyle='--', alpha=0.7)
+    plt.legend(handles=[Patch(color=color, label=f"Action {i}") for i, color in enumerate(ACTION_COLORS)],
+               title="Actions")
+    save("actions_taken_bar.png")
+    return written
+
+
+def aggregate_runs(run_dirs, column, reducer="sum"):
+    """
+    Per-episode values of a column across runs.
+    :return: (episodes, (runs, episodes) array) padded with NaN where a run has fewer episodes.
+    """
+    per_run = [MetricsReader(run_dir).per_episode(column, reducer) for run_dir in run_dirs]
+    size = max((int(episodes.max()) + 1 for episodes, _ in per_run if len(episodes)), default=0)
+    values = np.full((len(run_dirs), size), np.nan)
+    for i, (episodes, run_values) in enumerate(per_run):
+        values[i, episodes] = run_values
+    return np.arange(size), values
+
+
+def plot_runs(run_dirs, output_dir="results/plots"):
+    """Plot per-episode reward and waiting time aggregated over several runs. :return: Written paths."""
+    plt = _pyplot()
+    os.makedirs(output_dir, exist_ok=True)
+    written = []
+    for column, reducer, ylabel in (("reward", "sum", "Episode Reward"), ("waiting_time", "mean", "Mean Waiting Time")):
+        episodes, values = aggregate_runs(run_dirs, column, reducer)
+        if len(episodes) == 0:
+            continue
+        plt.figure(figsize=(12, 6))
+        plt.plot(episodes, np.nanmean(values, axis=0), color='green', label=f"Mean over {len(run_dirs)} runs")
+        plt.fill_between(episodes, np.nanmin(values, axis=0), np.nanmax(values, axis=0), color='green', alpha=0.2,
+                         label="Min / max")
+        plt.xlabel("Episode")
+        plt.ylabel(ylabel)
+        plt.title(f"{ylabel} across Runs")
+        plt.legend()
+        plt.grid()
+        path = os.path.join(output_dir, f"runs_{column}.png")
+        plt.savefig(path)
+        plt.close()
+        written.append(path)
+    return written
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Plot metrics logs written during training.")
+    parser.add_argument("runs", nargs="+", help="Run directories written by MetricsWriter")
+    parser.add_argument("--output", default="results/plots", help="Directory for the images")
+    parser.add_argument("--max-points", type=int, default=5000, help="Points per per-step plot")
+    args = parser.parse_args()
+
+    paths = plot_run(args.runs[0], args.output, args.max_points)
+    if len(args.runs) > 1:
+        paths += plot_runs(args.runs, args.output)
+    for path in paths:
+        print(path)
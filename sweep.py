@@ -0,0 +1,173 @@
+"""
+Hyperparameter and seed sweeps over a process pool, recorded in SQLite.
+
+The search space is a JSON object mapping parameter names to a list of values (grid search, or
+sampled uniformly with --random), {"uniform": [low, high]} or {"log_uniform": [low, high]} (random
+search only). Agent parameters (gamma, epsilon, epsilon_decay, epsilon_min, learning_rate,
+memory_size, target_update_freq, tau, prioritized_replay, ...) go to DQNAgent; episodes,
+batch_size, max_steps and seed control training. Each trial trains in its own worker process
+against its own surrogate or SUMO instance and reports every episode's total reward; trials whose
+reward falls below the median of the other trials at the same episode are pruned.
+
+Rerunning the same command resumes the sweep: finished trials are kept, interrupted ones restart.
+
+Usage:
+    python sweep.py --space sweep_space.json --db results/sweep.db [--random 20] [--workers 4]
+                    [--env surrogate|sumo] [--backend libsumo]
+"""
+import argparse
+import itertools
+import json
+import logging
+import multiprocessing as mp
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from SweepStore import COMPLETE, FAILED, PRUNED, SweepStore
+
+logger = logging.getLogger(__name__)
+
+# Training settings a trial may override; everything else in a parameter set goes to DQNAgent
+TRAINING_DEFAULTS = {"episodes": 5, "batch_size": 64, "max_steps": 100, "seed": 0}
+
+
+def grid(space):
+    """Every combination of the listed values. :return: List of parameter dicts."""
+    names = sorted(space)
+    for name in names:
+        if not isinstance(space[name], list):
+            raise ValueError(f"Grid search needs a list of values for {name!r}")
+    return [dict(zip(names, values)) for values in itertools.product(*(space[name] for name in names))]
+
+
+def random_search(space, num_trials, seed=0):
+    """Sample num_trials parameter dicts from the space. :return: List of parameter dicts."""
+    rng = np.random.default_rng(seed)
+    trials = []
+    for _ in range(num_trials):
+        params = {}
+        for name in sorted(space):
+            spec = space[name]
+            if isinstance(spec, list):
+                params[name] = spec[rng.integers(len(spec))]
+            elif "uniform" in spec:
+                params[name] = float(rng.uniform(*spec["uniform"]))
+            elif "log_uniform" in spec:
+                low, high = np.log(spec["log_uniform"])
+                params[name] = float(np.exp(rng.uniform(low, high)))
+            else:
+                raise ValueError(f"Unknown search space entry for {name!r}: {spec}")
+            if isinstance(params[name], np.generic):
+                params[name] = params[name].item()
+        trials.append(params)
+    return trials
+
+
+def make_env(env_name, trial_id, seed, sumo_cfg_file="ProjectFinal.sumocfg", backend="libsumo"):
+    """The trial's own environment: the cell-transmission surrogate or a headless SUMO instance."""
+    if env_name == "surrogate":
+        from CellTransmissionEnvironment import CellTransmissionEnvironment
+        return CellTransmissionEnvironment(seed=seed)
+    from DynamicFlowSumoEnvironment import DynamicFlowSumoEnvironment
+    return DynamicFlowSumoEnvironment(sumo_cfg_file, "J12", demand_seed=seed, backend=backend,
+                                      label=f"trial_{trial_id}",
+                                      sumo_args=["--no-step-log", "--no-warnings", "--seed", str(seed)])
+
+
+def run_trial(trial_id, params, db_path, env_name, backend, prune_kwargs):
+    """
+    Train one parameter set in a worker process, reporting each episode to the store.
+    :return: (trial id, status, final reward) where the final reward is the last episode's total.
+    """
+    import keras
+    from DQNAgent import DQNAgent
+
+    store = SweepStore(db_path)
+    training = {name: params.get(name, default) for name, default in TRAINING_DEFAULTS.items()}
+    agent_kwargs = {name: value for name, value in params.items() if name not in TRAINING_DEFAULTS}
+    store.start(trial_id)
+    env = None
+    try:
+        keras.utils.set_random_seed(training["seed"])
+        env = make_env(env_name, trial_id, training["seed"], backend=backend)
+        agent = DQNAgent(env.state_size, env.action_size, **agent_kwargs)
+        status, total_reward = COMPLETE, None
+        for episode in range(training["episodes"]):
+            state = np.reshape(env.reset(), [1, env.state_size])
+            total_reward = 0.0
+            for step in range(training["max_steps"]):
+                action = agent.act(state)
+                next_state, reward, done = env.step(action, step_count=step, max_steps=training["max_steps"])
+                next_state = np.reshape(next_state, [1, env.state_size])
+                agent.remember(state, action, reward, next_state, done)
+                state = next_state
+                total_reward += float(reward)
+                if len(agent.memory) > training["batch_size"]:
+                    agent.replay(training["batch_size"])
+                if done:
+                    break
+            store.report(trial_id, episode, total_reward)
+            if store.should_prune(trial_id, episode, total_reward, **prune_kwargs):
+                status = PRUNED
+                break
+        store.finish(trial_id, status, total_reward)
+        return trial_id, status, total_reward
+    except Exception as error:
+        store.finish(trial_id, FAILED, error=repr(error))
+        return trial_id, FAILED, None
+    finally:
+        if env is not None:
+            env.close()
+        store.close()
+
+
+def run_sweep(param_sets, db_path, workers=2, env_name="surrogate", backend="libsumo", prune_kwargs=None):
+    """
+    Add the parameter sets to the store and run every pending trial over a process pool.
+    :return: Store results, best final reward first.
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+    store = SweepStore(db_path)
+    added = store.add_trials(param_sets)
+    requeued = store.requeue_interrupted()
+    pending = store.pending()
+    logger.info("%d new trials, %d interrupted trials requeued, %d to run", added, requeued, len(pending))
+
+    # Spawned workers so each trial gets a fresh TensorFlow runtime and SUMO connection
+    with ProcessPoolExecutor(max_workers=workers, mp_context=mp.get_context("spawn")) as pool:
+        futures = [pool.submit(run_trial, trial_id, params, db_path, env_name, backend, prune_kwargs or {})
+                   for trial_id, params in pending]
+        for future in as_completed(futures):
+            trial_id, status, reward = future.result()
+            logger.info("Trial %d %s, final episode reward %s", trial_id, status, reward)
+    results = store.results()
+    store.close()
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Parallel hyperparameter and seed sweep.")
+    parser.add_argument("--space", required=True, help="JSON file describing the search space")
+    parser.add_argument("--db", default="results/sweep.db", help="SQLite store; rerun with the same file to resume")
+    parser.add_argument("--random", type=int, default=0, help="Sample this many trials instead of the full grid")
+    parser.add_argument("--search-seed", type=int, default=0, help="Seed of the random search")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--env", default="surrogate", choices=["surrogate", "sumo"])
+    parser.add_argument("--backend", default="libsumo", choices=["sumo", "libsumo"])
+    parser.add_argument("--min-trials", type=int, default=4, help="Reports per episode needed before pruning")
+    parser.add_argument("--prune-percentile", type=float, default=50.0)
+    parser.add_argument("--warmup-episodes", type=int, default=1, help="Episodes run before a trial can be pruned")
+    parser.add_argument("--top", type=int, default=5, help="Number of best trials to print")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    with open(args.space) as f:
+        space = json.load(f)
+    param_sets = random_search(space, args.random, args.search_seed) if args.random else grid(space)
+    results = run_sweep(param_sets, args.db, args.workers, args.env, args.backend,
+                        {"min_trials": args.min_trials, "percentile": args.prune_percentile,
+                         "warmup_episodes": args.warmup_episodes})
+    for result in results[:args.top]:
+        print(f"{result['final_reward']!s:>22} {result['status']:<9} {json.dumps(result['params'], sort_keys=True)}")
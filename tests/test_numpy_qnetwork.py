@@ -0,0 +1,28 @@
+"""The NumPy forward pass must reproduce the Keras model it mirrors."""
+import numpy as np
+import pytest
+
+pytest.importorskip("keras")
+pytest.importorskip("h5py")
+
+from DQNAgent import DQNAgent
+from NumpyQNetwork import NumpyQNetwork
+
+
+def test_from_h5_matches_keras(tmp_path):
+    agent = DQNAgent(state_size=3, action_size=5)
+    path = str(tmp_path / "model.h5")
+    agent.model.save(path)
+    network = NumpyQNetwork.from_h5(path)
+
+    states = np.random.default_rng(0).uniform(0.0, 100.0, size=(256, 3)).astype(np.float32)
+    expected = agent.model.predict_on_batch(states)
+    np.testing.assert_allclose(network.predict_batch(states), expected, rtol=1e-5, atol=1e-5)
+    np.testing.assert_allclose(network.predict(states[:1]), expected[:1], rtol=1e-5, atol=1e-5)
+
+
+def test_sync_from_matches_keras():
+    agent = DQNAgent(state_size=3, action_size=5)
+    states = np.random.default_rng(1).uniform(0.0, 100.0, size=(64, 3)).astype(np.float32)
+    np.testing.assert_allclose(agent.inference.predict_batch(states), agent.model.predict_on_batch(states),
+                               rtol=1e-5, atol=1e-5)
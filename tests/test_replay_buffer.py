@@ -0,0 +1,47 @@
+"""A memory-mapped replay buffer must survive being reopened by a later process."""
+import numpy as np
+import pytest
+
+from ReplayBuffer import ReplayBuffer
+
+
+def fill(buffer, start, n):
+    for i in range(start, start + n):
+        buffer.add(np.full(3, i, dtype=np.float32), i % 5, float(i), np.full(3, -i, dtype=np.float32), i % 7 == 0)
+
+
+def test_reopen_keeps_transitions(tmp_path):
+    path = str(tmp_path / "memory")
+    buffer = ReplayBuffer(100, 3, filename=path, meta_interval=10)
+    fill(buffer, 0, 125)  # Wraps around; meta.json was last written after 120 transitions
+    del buffer  # No flush, as after a crash
+
+    reopened = ReplayBuffer(100, 3, filename=path, meta_interval=10)
+    assert len(reopened) == 100
+    assert reopened.cursor == 20
+    # Rows 0..24 hold transitions 100..124 and rows 25..99 transitions 25..99; the five written after
+    # the last meta.json update lie past the restored cursor and are overwritten next
+    expected = np.concatenate([np.arange(100, 125), np.arange(25, 100)])
+    np.testing.assert_array_equal(reopened.rewards, expected)
+    np.testing.assert_array_equal(reopened.states[:, 0], expected)
+    np.testing.assert_array_equal(reopened.next_states[:, 0], -expected)
+    np.testing.assert_array_equal(reopened.actions, expected % 5)
+    np.testing.assert_array_equal(reopened.dones, expected % 7 == 0)
+
+
+def test_flush_records_every_transition(tmp_path):
+    path = str(tmp_path / "memory")
+    buffer = ReplayBuffer(100, 3, filename=path, meta_interval=1000)
+    fill(buffer, 0, 42)
+    buffer.flush()
+    reopened = ReplayBuffer(100, 3, filename=path)
+    assert (len(reopened), reopened.cursor) == (42, 42)
+    np.testing.assert_array_equal(reopened.rewards[:42], np.arange(42))
+
+
+@pytest.mark.parametrize("capacity, state_size", [(50, 3), (100, 4)])
+def test_shape_mismatch_raises(tmp_path, capacity, state_size):
+    path = str(tmp_path / "memory")
+    ReplayBuffer(100, 3, filename=path).flush()
+    with pytest.raises(ValueError):
+        ReplayBuffer(capacity, state_size, filename=path)
@@ -0,0 +1,59 @@
+"""The subscription-backed observations must match the per-call TraCI getters they replaced."""
+import os
+
+import numpy as np
+import pytest
+
+from DynamicFlowSumoEnvironment import DynamicFlowSumoEnvironment
+from SumoEnvironment import REWARD_WEIGHTS
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def make_env(backend, snapshot_reset=False):
+    kwargs = {"demand_seed": 0, "snapshot_reset": snapshot_reset}
+    if backend == "fake":
+        from fake_traci import FakeTraci
+        kwargs["traci_module"] = FakeTraci()
+    else:
+        pytest.importorskip(backend)
+        kwargs["backend"] = backend
+        kwargs["sumo_args"] = ["--no-step-log", "--no-warnings", "--seed", "0"]
+    return DynamicFlowSumoEnvironment(os.path.join(ROOT, "ProjectFinal.sumocfg"), "J12", **kwargs)
+
+
+def direct_state(env):
+    """get_state as it was computed before subscriptions, one getter call per value."""
+    traci = env.traci
+    density = traci.lane.getLastStepVehicleNumber(env.density_lane) / traci.lane.getLength(env.density_lane)
+    waiting_time = traci.edge.getWaitingTime(env.waiting_edge)
+    queue_length = traci.lane.getLastStepVehicleNumber(env.queue_lane)
+    return np.array([density, waiting_time, queue_length])
+
+
+def direct_reward(env):
+    """The instantaneous get_reward as it was computed before subscriptions."""
+    traci = env.traci
+    flow = sum(traci.edge.getLastStepVehicleNumber(edge) for edge in env.reward_edges)
+    waiting_time = sum(traci.edge.getWaitingTime(edge) for edge in env.reward_edges)
+    queue_length = sum(traci.lane.getLastStepVehicleNumber(lane) for lane in env.reward_lanes)
+    return (REWARD_WEIGHTS["flow_rate"] * flow + REWARD_WEIGHTS["waiting_time"] * waiting_time +
+            REWARD_WEIGHTS["queue_length"] * queue_length) / len(env.reward_edges)
+
+
+@pytest.mark.parametrize("snapshot_reset", [False, True])
+@pytest.mark.parametrize("backend", ["fake", "libsumo"])
+def test_subscriptions_match_getters(backend, snapshot_reset):
+    env = make_env(backend, snapshot_reset)
+    try:
+        for episode in range(2):
+            state = env.reset()
+            np.testing.assert_allclose(state, direct_state(env))
+            for step in range(10):
+                state, _, _ = env.step(step % env.action_size, step_count=step, max_steps=10)
+                np.testing.assert_allclose(state, direct_state(env))
+                # The reward of a step aggregates its window; compare the instantaneous terms
+                env.window = None
+                assert env.get_reward() == pytest.approx(direct_reward(env))
+    finally:
+        env.close()
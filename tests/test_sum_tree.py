@@ -0,0 +1,41 @@
+"""SumTree prefix-sum lookups and the sampling proportions of PrioritizedReplayBuffer built on them."""
+import numpy as np
+
+from PrioritizedReplayBuffer import PrioritizedReplayBuffer, SumTree
+
+
+def test_find_maps_prefix_sums_to_leaves():
+    tree = SumTree(5)  # Not a power of two: three padding leaves stay at zero
+    tree.update(np.arange(5), [1.0, 2.0, 0.0, 3.0, 4.0])
+    assert tree.total() == 10.0
+    # Cumulative ranges: leaf 0 (0, 1], leaf 1 (1, 3], leaf 3 (3, 6], leaf 4 (6, 10]; leaf 2 is empty
+    values = [0.0, 0.5, 1.0, 1.5, 3.0, 3.5, 6.0, 6.5, 9.99, 10.0]
+    np.testing.assert_array_equal(tree.find(values), [0, 0, 0, 1, 1, 3, 3, 4, 4, 4])
+
+
+def test_update_refreshes_ancestors():
+    tree = SumTree(8)
+    tree.update(np.arange(8), 1.0)
+    tree.update([2, 2, 6], [5.0, 5.0, 0.5])  # Repeated indices must not be summed twice
+    assert tree.total() == 1.0 * 6 + 5.0 + 0.5
+    assert tree.max_leaf() == 5.0
+    for node in range(1, tree.offset):
+        assert tree.nodes[node] == tree.nodes[2 * node] + tree.nodes[2 * node + 1]
+
+
+def test_sampling_is_proportional_to_priority():
+    priorities = np.array([1.0, 2.0, 3.0, 4.0, 0.0, 10.0])
+    tree = SumTree(len(priorities))
+    tree.update(np.arange(len(priorities)), priorities)
+    rng = np.random.default_rng(0)
+    counts = np.bincount(tree.find(rng.random(200_000) * tree.total()), minlength=len(priorities))
+    np.testing.assert_allclose(counts / counts.sum(), priorities / priorities.sum(), atol=0.005)
+
+
+def test_buffer_samples_by_td_error():
+    buffer = PrioritizedReplayBuffer(4, 1, alpha=1.0, epsilon=0.0, seed=0)
+    for i in range(4):
+        buffer.add(np.zeros(1), 0, 0.0, np.zeros(1), False)
+    buffer.update_priorities(np.arange(4), np.array([1.0, -1.0, 2.0, 4.0]))
+    counts = np.bincount(np.concatenate([buffer.sample_indices(32) for _ in range(2000)]), minlength=4)
+    np.testing.assert_allclose(counts / counts.sum(), [0.125, 0.125, 0.25, 0.5], atol=0.01)
@@ -0,0 +1,47 @@
+"""
+Train the DQN on recorded transition datasets, without starting SUMO.
+
+Datasets are directories written by TransitionRecorder (e.g. DynamicFlowSumoEnvironment with
+record_dir, or main.py with record_dir set); several can be given and are trained on in turn.
+
+Usage: python train_offline.py results/transitions/actor_0 [...] [--epochs 5] [--batch-size 64]
+                               [--model results/dqn_model.h5] [--init-model results/dqn_model.h5]
+"""
+import argparse
+import logging
+import time
+
+from SumoEnvironment import ACTIONS
+from TransitionDataset import TransitionDataset
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train the DQN offline on recorded transitions.")
+    parser.add_argument("datasets", nargs="+", help="Dataset directories written by TransitionRecorder")
+    parser.add_argument("--epochs", type=int, default=1)
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the minibatch shuffling")
+    parser.add_argument("--prefetch", type=int, default=4, help="Minibatches prepared ahead by the reader thread")
+    parser.add_argument("--init-model", help="Start from the weights of this saved model")
+    parser.add_argument("--model", default="results/dqn_model.h5", help="Where to save the trained model")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    from DQNAgent import DQNAgent
+
+    datasets = [TransitionDataset(path) for path in args.datasets]
+    # Datasets recorded before action_size was stored used the standard signal plans
+    sizes = {(dataset.state_size, dataset.action_size or len(ACTIONS)) for dataset in datasets}
+    if len(sizes) > 1:
+        parser.error(f"Datasets disagree on (state size, action size): {sorted(sizes)}")
+    state_size, action_size = sizes.pop()
+    agent = DQNAgent(state_size=state_size, action_size=action_size)
+    if args.init_model:
+        agent.model.load_weights(args.init_model)
+        agent.update_target_model()
+    start = time.perf_counter()
+    updates = sum(agent.train_offline(dataset, batch_size=args.batch_size, epochs=args.epochs, seed=args.seed,
+                                      prefetch=args.prefetch) for dataset in datasets)
+    elapsed = time.perf_counter() - start
+    logging.info("%d updates in %.1f s (%.1f updates/s)", updates, elapsed, updates / elapsed)
+    agent.model.save(args.model)
+    logging.info("Model saved to %s.", args.model)